@@ -1,65 +1,179 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response, g
 import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import pandas as pd
 import boto3
 import re
+import threading
+import hashlib
+import base64
+import functools
+import gzip
+from collections import OrderedDict
+from collections import defaultdict
 from urllib.parse import urlparse
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Only the CSV files can be read without pyarrow
+    pq = None
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without the brotli package
+    brotli = None
+
 app = Flask(__name__)
 
+# Directory holding the CSVs produced by data_generation.py
+DATA_DIR = "processed_data"
+DATA_FILES = (
+    "cooperative_info.csv",
+    "producers.csv",
+    "aggregate.csv",
+    "chat_history.csv",
+    "diagnostics.csv",
+    "producers.parquet",
+    "aggregate.parquet",
+    "chat_history.parquet",
+)
+
+
+# Producer columns stored as JSON strings in producers.csv
+PRODUCER_JSON_COLUMNS = (
+    "yield_history",
+    "tree_health",
+    "soil_quality",
+    "recent_activities",
+)
+
+
+def frame_records(df):
+    """Convert a DataFrame to a list of dicts, with missing values as None."""
+    # NaN would be emitted as a bare NaN token, which is not valid JSON
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def decode_json_columns(df, columns):
+    """Parse JSON string columns of a DataFrame, one column at a time."""
+    loads = json.loads
+    for column in columns:
+        if column in df.columns:
+            df[column] = [loads(value) for value in df[column].tolist()]
+    return df
+
+
+def build_chat_threads(chat_df):
+    """
+    Group chat rows into per-producer threads.
+
+    Args:
+        chat_df (DataFrame): Rows with producer_id, date, from and message
+
+    Returns:
+        list: Threads sorted by producer_id, each with its messages in file order
+    """
+    messages = frame_records(chat_df[["date", "from", "message"]])
+    threads = defaultdict(list)
+    for producer_id, message in zip(chat_df["producer_id"].tolist(), messages):
+        threads[producer_id].append(message)
+
+    return [
+        {"producer_id": producer_id, "messages": threads[producer_id]}
+        for producer_id in sorted(threads)
+    ]
+
+
+def _parquet_path(data_dir, name):
+    """
+    Return the path of <name>.parquet if it should be read instead of the CSV.
+
+    The Parquet file is used when it can be read and is at least as new as
+    <name>.csv, so whichever format data_generation wrote last wins.
+    """
+    path = os.path.join(data_dir, f"{name}.parquet")
+    if pq is None or not os.path.exists(path):
+        return None
+    csv_path = os.path.join(data_dir, f"{name}.csv")
+    if os.path.exists(csv_path) and (
+        os.path.getmtime(csv_path) > os.path.getmtime(path)
+    ):
+        return None
+    return path
+
+
+def read_table(data_dir, name):
+    """Read a flat table from the newer of <name>.parquet and <name>.csv."""
+    parquet_path = _parquet_path(data_dir, name)
+    if parquet_path:
+        return pq.read_table(parquet_path, memory_map=True).to_pandas()
+    return pd.read_csv(os.path.join(data_dir, f"{name}.csv"))
+
 
-# Load data from CSV files
-def load_data_from_csv():
+def load_producers(data_dir):
+    """
+    Load producer records with their nested fields decoded.
+
+    producers.parquet stores the nested fields as native list and struct
+    columns and is read through a memory map. producers.csv stores them as
+    JSON strings that are parsed here.
+    """
+    parquet_path = _parquet_path(data_dir, "producers")
+    if parquet_path:
+        producers = pq.read_table(parquet_path, memory_map=True).to_pylist()
+        for producer in producers:
+            producer.pop("profile_image", None)
+            producer["farm_images"] = []
+        return producers
+
+    producers_df = pd.read_csv(os.path.join(data_dir, "producers.csv"))
+    producers_df = decode_json_columns(producers_df, PRODUCER_JSON_COLUMNS)
+
+    # Remove profile_image entirely - don't even include the field
+    producers_df = producers_df.drop(columns=["profile_image"], errors="ignore")
+
+    # Remove farm_images to prevent any image processing
+    producers_df["farm_images"] = [[] for _ in range(len(producers_df))]
+
+    return frame_records(producers_df)
+
+
+# Load data from CSV (or Parquet) files
+def load_data_from_csv(data_dir=DATA_DIR):
     # Load cooperative info
-    coop_df = pd.read_csv("processed_data/cooperative_info.csv")
-    coop_info = coop_df.iloc[0].to_dict()
+    coop_df = pd.read_csv(os.path.join(data_dir, "cooperative_info.csv"))
+    coop_info = frame_records(coop_df)[0]
     # Convert certification string back to list
     coop_info["certification"] = json.loads(coop_info["certification"])
 
     # Load producers
-    producers_df = pd.read_csv("processed_data/producers.csv")
-    producers = []
-    for _, row in producers_df.iterrows():
-        producer = row.to_dict()
-        # Convert JSON strings back to original structures
-        producer["yield_history"] = json.loads(producer["yield_history"])
-        producer["tree_health"] = json.loads(producer["tree_health"])
-        producer["soil_quality"] = json.loads(producer["soil_quality"])
-        producer["recent_activities"] = json.loads(producer["recent_activities"])
-
-        # Remove profile_image entirely - don't even include the field
-        if "profile_image" in producer:
-            del producer["profile_image"]
-
-        # Remove farm_images to prevent any image processing
-        producer["farm_images"] = []
-
-        producers.append(producer)
+    producers = load_producers(data_dir)
 
     # Load aggregate data
-    aggregate_df = pd.read_csv("processed_data/aggregate.csv")
-    aggregate = aggregate_df.iloc[0].to_dict()
+    aggregate_df = read_table(data_dir, "aggregate")
+    aggregate = frame_records(aggregate_df)[0]
     # Convert JSON strings back to original structures
     for key, value in aggregate.items():
         if isinstance(value, str) and value.startswith("{"):
             aggregate[key] = json.loads(value)
 
     # Load chat history
-    chat_df = pd.read_csv("processed_data/chat_history.csv")
-    chat_history = []
-
-    # Group by producer_id
-    for producer_id, group in chat_df.groupby("producer_id"):
-        messages = []
-        for _, row in group.iterrows():
-            messages.append(
-                {"date": row["date"], "from": row["from"], "message": row["message"]}
-            )
+    chat_df = read_table(data_dir, "chat_history")
+    chat_history = build_chat_threads(chat_df)
 
-        chat_history.append({"producer_id": producer_id, "messages": messages})
+    # Load diagnostics, or generate a stable placeholder set if none are stored
+    diagnostics_path = os.path.join(data_dir, "diagnostics.csv")
+    if os.path.exists(diagnostics_path):
+        diagnostics = frame_records(pd.read_csv(diagnostics_path))
+    else:
+        diagnostics = generate_diagnostics_data(_latest_activity_date(producers))
 
     # Recreate the producers_data structure
     producers_data = {
@@ -67,28 +181,341 @@ def load_data_from_csv():
         "producers": producers,
         "aggregate": aggregate,
         "chat_history": chat_history,
+        "diagnostics": diagnostics,
     }
+    producers_data.update(build_lookup_indexes(producers, chat_history, diagnostics))
+    producers_data["summary"] = build_dashboard_summary(producers)
 
     return producers_data
 
 
+def _latest_activity_date(producers):
+    """Return the most recent last_active date, or today if there is none."""
+    dates = [p["last_active"] for p in producers if isinstance(p["last_active"], str)]
+    try:
+        return datetime.strptime(max(dates), "%Y-%m-%d")
+    except ValueError:
+        return datetime.now()
+
+
+def build_lookup_indexes(producers, chat_history, diagnostics):
+    """
+    Build the dicts used by the detail pages to find records in O(1).
+
+    Returns:
+        dict: producers_by_id, chat_by_producer_id, activities_by_key and
+        diagnostics_by_producer_id, where activities are keyed by
+        (producer id, activity date)
+    """
+    producers_by_id = {}
+    activities_by_key = {}
+    for producer in producers:
+        producer_id = int(producer["id"])
+        producers_by_id.setdefault(producer_id, producer)
+        for activity in producer["recent_activities"]:
+            # Keep the first activity for a date, as the old linear scan did
+            activities_by_key.setdefault((producer_id, activity["date"]), activity)
+
+    chat_by_producer_id = {}
+    for chat in chat_history:
+        chat_by_producer_id.setdefault(int(chat["producer_id"]), chat)
+
+    diagnostics_by_producer_id = defaultdict(list)
+    for diagnostic in diagnostics:
+        diagnostics_by_producer_id[int(diagnostic["producer_id"])].append(diagnostic)
+
+    return {
+        "producers_by_id": producers_by_id,
+        "chat_by_producer_id": chat_by_producer_id,
+        "activities_by_key": activities_by_key,
+        "diagnostics_by_producer_id": dict(diagnostics_by_producer_id),
+    }
+
+
+# Upper bounds (exclusive) of the tree health buckets shown on the dashboard
+HEALTH_BUCKETS = (("under_70", 70), ("70_to_84", 85), ("85_and_over", None))
+
+
+def _healthy_percent(tree_health):
+    """Return the healthy share of a producer's trees as a number."""
+    healthy = tree_health["healthy"]
+    if isinstance(healthy, str):
+        return int(healthy.replace("%", ""))
+    return healthy
+
+
+def build_dashboard_summary(producers):
+    """
+    Compute the dashboard statistics once per dataset load.
+
+    Returns:
+        dict: total_trees, avg_health and estimated_yield for the cooperative,
+        plus by_village and by_health_bucket breakdowns
+    """
+    total_trees = 0
+    total_health = 0
+    estimated_yield = 0
+    by_village = {}
+    by_health_bucket = {name: 0 for name, _ in HEALTH_BUCKETS}
+
+    for producer in producers:
+        healthy = _healthy_percent(producer["tree_health"])
+        total_trees += producer["num_trees"]
+        total_health += healthy
+        estimated_yield += producer["estimated_yield"]
+
+        village = by_village.setdefault(
+            producer["village"],
+            {"producers": 0, "total_trees": 0, "estimated_yield": 0, "avg_health": 0},
+        )
+        village["producers"] += 1
+        village["total_trees"] += producer["num_trees"]
+        village["estimated_yield"] += producer["estimated_yield"]
+        # Accumulate the sum here and turn it into a mean below
+        village["avg_health"] += healthy
+
+        for name, upper_bound in HEALTH_BUCKETS:
+            if upper_bound is None or healthy < upper_bound:
+                by_health_bucket[name] += 1
+                break
+
+    for village in by_village.values():
+        village["avg_health"] = village["avg_health"] / village["producers"]
+
+    return {
+        "total_trees": total_trees,
+        "avg_health": total_health / len(producers) if producers else 0,
+        "estimated_yield": estimated_yield,
+        "by_village": by_village,
+        "by_health_bucket": by_health_bucket,
+    }
+
+
+class DatasetCache:
+    """Process-wide cache of the dashboard dataset.
+
+    The CSVs are loaded once and kept in memory. Each access stats the source
+    files; when a file's mtime or size changes, a background thread rebuilds
+    the dataset and swaps it in with a single reference assignment, so
+    requests keep serving the previous version until the new one is complete.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, loader=load_data_from_csv):
+        self.data_dir = data_dir
+        self.loader = loader
+        self._data = None
+        self._signature = None
+        # Files that failed to load are not retried until they change again
+        self._failed_signature = None
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def _file_signature(self):
+        """Return a tuple of (filename, mtime_ns, size) for every source file."""
+        signature = []
+        for filename in DATA_FILES:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, filename))
+                signature.append((filename, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((filename, None, None))
+        return tuple(signature)
+
+    def _reload(self, signature):
+        data = self.loader(self.data_dir)
+        # Identify this load so derived caches can tell when data changed
+        data["version"] = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+        data["last_modified"] = (
+            max(
+                (mtime_ns for _, mtime_ns, _ in signature if mtime_ns is not None),
+                default=0,
+            )
+            / 1e9
+        )
+        # Publish the fully built dataset in one step
+        self._data = data
+        self._signature = signature
+
+    def _reload_in_background(self, signature):
+        try:
+            self._reload(signature)
+        except Exception as e:
+            self._failed_signature = signature
+            app.logger.error(f"Error reloading dataset from {self.data_dir}: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def get(self):
+        """Return the current dataset, scheduling a reload if the files changed."""
+        signature = self._file_signature()
+
+        if self._data is None:
+            # Nothing to serve yet, so the first load has to block
+            with self._lock:
+                if self._data is None:
+                    self._reload(signature)
+            return self._data
+
+        if signature not in (self._signature, self._failed_signature):
+            with self._lock:
+                if not self._reloading:
+                    self._reloading = True
+                    threading.Thread(
+                        target=self._reload_in_background,
+                        args=(signature,),
+                        daemon=True,
+                    ).start()
+
+        return self._data
+
+
+dataset_cache = DatasetCache()
+
+
+def current_dataset():
+    """
+    Return the dataset for the current request.
+
+    The first call in a request takes a snapshot from dataset_cache and later
+    calls return the same one, so a background reload in between cannot pair
+    the ETag of one version with the content of another.
+    """
+    if "dataset" not in g:
+        g.dataset = dataset_cache.get()
+    return g.dataset
+
+
+def dumps_json(obj):
+    """Serialize obj to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode("utf-8")
+
+
+class PayloadCache:
+    """
+    Serialized JSON blobs keyed by dataset version.
+
+    Entries for older dataset versions are dropped as soon as a blob for a
+    newer version is stored, so memory stays bounded to one dataset.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, name, build):
+        """
+        Return the cached bytes for name, serializing build() on a miss.
+
+        Args:
+            version (str): Version of the dataset the payload is derived from
+            name (str): Payload name, unique per version
+            build (callable): Returns the object to serialize
+        """
+        if self._version == version and name in self._payloads:
+            return self._payloads[name]
+
+        payload = dumps_json(build())
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                self._payloads = {}
+            self._payloads[name] = payload
+        return payload
+
+
+payload_cache = PayloadCache()
+
+
+def conditional_get(view):
+    """
+    Answer conditional GETs for a route from the dataset version.
+
+    The ETag is derived from the dataset version and the request path with its
+    query string, so it changes whenever the underlying data or the route
+    parameters do. Requests whose If-None-Match or If-Modified-Since header
+    still matches get an empty 304 without the view being called.
+
+    compress_response appends the content coding to the ETag of compressed
+    bodies, so If-None-Match accepts any of those variants.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        producers_data = current_dataset()
+        etag = hashlib.sha1(
+            f"{producers_data['version']}:{request.full_path}".encode("utf-8")
+        ).hexdigest()
+        last_modified = datetime.fromtimestamp(
+            int(producers_data["last_modified"]), tz=timezone.utc
+        )
+
+        if request.if_none_match:
+            variants = [etag] + [f"{etag}-{encoding}" for encoding in ("br", "gzip")]
+            matched = next(
+                (tag for tag in variants if request.if_none_match.contains(tag)),
+                None,
+            )
+            not_modified = matched is not None
+        else:
+            matched = None
+            not_modified = (
+                request.if_modified_since is not None
+                and last_modified <= request.if_modified_since
+            )
+
+        if not_modified:
+            response = make_response("", 304)
+            response.set_etag(matched or etag)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response.set_etag(etag)
+
+        response.last_modified = last_modified
+        # Let clients store the page but revalidate it on every use
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
+
+
+# Seed for the placeholder diagnostics used when no diagnostics.csv exists
+DIAGNOSTICS_SEED = 42
+
+
 # Generate some diagnostic data
-def generate_diagnostics_data():
+def generate_diagnostics_data(reference_date, seed=DIAGNOSTICS_SEED):
+    """
+    Generate placeholder tree diagnostics.
+
+    The records only depend on the seed and the reference date, so the same
+    dataset always produces the same diagnostics.
+
+    Args:
+        reference_date (datetime): Date the diagnostics are dated back from
+        seed (int): Seed for the random generator
+    """
+    rng = random.Random(seed)
     diagnostics_data = []
     for i in range(100):
-        random_date = datetime.now() - timedelta(days=random.randint(1, 180))
+        random_date = reference_date - timedelta(days=rng.randint(1, 180))
         diagnostics_data.append(
             {
-                "producer_id": random.randint(1, 5),
+                "producer_id": rng.randint(1, 5),
                 "date": random_date.strftime("%Y-%m-%d"),
-                "tree_id": f"TR-{random.randint(100, 999)}",
-                "health_score": random.randint(60, 100),
-                "leaf_condition": random.choice(
+                "tree_id": f"TR-{rng.randint(100, 999)}",
+                "health_score": rng.randint(60, 100),
+                "leaf_condition": rng.choice(
                     ["Healthy", "Yellowing", "Spots", "Wilting"]
                 ),
-                "pest_detected": random.choice([True, False, False, False]),
-                "disease_risk": random.choice(["Low", "Medium", "High", "Low", "Low"]),
-                "recommended_action": random.choice(
+                "pest_detected": rng.choice([True, False, False, False]),
+                "disease_risk": rng.choice(["Low", "Medium", "High", "Low", "Low"]),
+                "recommended_action": rng.choice(
                     ["None", "Fertilize", "Treat for Pests", "Pruning", "Water", "None"]
                 ),
             }
@@ -97,80 +524,65 @@ def generate_diagnostics_data():
 
 
 @app.route("/")
+@conditional_get
 def dashboard():
-    # Load data from CSV
-    producers_data = load_data_from_csv()
-
-    # Generate diagnostic data
-    diagnostics_data = generate_diagnostics_data()
+    # Load data from the in-process cache
+    producers_data = current_dataset()
 
     # Get aggregated data
     coop_info = producers_data["cooperative_info"]
     producers = producers_data["producers"]
     aggregate = producers_data["aggregate"]
 
-    # Calculate summary statistics
-    total_trees = sum(p["num_trees"] for p in producers)
-    avg_health = (
-        sum(
-            (
-                int(p["tree_health"]["healthy"].replace("%", ""))
-                if isinstance(p["tree_health"]["healthy"], str)
-                else p["tree_health"]["healthy"]
-            )
-            for p in producers
-        )
-        / len(producers)
-        if producers
-        else 0
-    )
-    estimated_yield_current = sum(p["estimated_yield"] for p in producers)
+    # Summary statistics are computed when the dataset loads
+    summary = producers_data["summary"]
 
-    # Convert data to JSON for JavaScript
-    producers_json = json.dumps(producers)
-    chat_json = json.dumps(producers_data["chat_history"])
-    aggregate_json = json.dumps(aggregate)
-    diagnostics_json = json.dumps(diagnostics_data)
+    # Convert data to JSON for JavaScript, reusing blobs until the data changes
+    version = producers_data["version"]
+    producers_json = payload_cache.get(version, "producers", lambda: producers)
+    chat_json = payload_cache.get(
+        version, "chat_history", lambda: producers_data["chat_history"]
+    )
+    aggregate_json = payload_cache.get(version, "aggregate", lambda: aggregate)
+    diagnostics_json = payload_cache.get(
+        version, "diagnostics", lambda: producers_data["diagnostics"]
+    )
 
     return render_template(
         "dashboard.html",
         coop_info=coop_info,
         producers=producers,
-        total_trees=total_trees,
-        avg_health=avg_health,
-        estimated_yield=estimated_yield_current,
-        producers_json=producers_json,
-        chat_json=chat_json,
-        aggregate_json=aggregate_json,
-        diagnostics_json=diagnostics_json,
+        total_trees=summary["total_trees"],
+        avg_health=summary["avg_health"],
+        estimated_yield=summary["estimated_yield"],
+        summary=summary,
+        producers_json=producers_json.decode("utf-8"),
+        chat_json=chat_json.decode("utf-8"),
+        aggregate_json=aggregate_json.decode("utf-8"),
+        diagnostics_json=diagnostics_json.decode("utf-8"),
         aggregate=aggregate,
     )
 
 
 @app.route("/producer/<int:producer_id>")
+@conditional_get
 def producer_detail(producer_id):
-    # Load data from CSV
-    producers_data = load_data_from_csv()
-
-    # Generate diagnostic data
-    diagnostics_data = generate_diagnostics_data()
+    # Load data from the in-process cache
+    producers_data = current_dataset()
 
-    producer = next(
-        (p for p in producers_data["producers"] if p["id"] == producer_id), None
-    )
+    producer = producers_data["producers_by_id"].get(producer_id)
     if not producer:
         return "Producer not found", 404
 
     # Get chat history for this producer
-    chat_history = next(
-        (c for c in producers_data["chat_history"] if c["producer_id"] == producer_id),
-        {"messages": []},
+    chat_history = producers_data["chat_by_producer_id"].get(
+        producer_id, {"messages": []}
     )
 
     # Get diagnostics for this producer
-    producer_diagnostics = [
-        d for d in diagnostics_data if d["producer_id"] == producer_id
-    ]
+    producer_diagnostics = producers_data["diagnostics_by_producer_id"].get(
+        producer_id, []
+    )
 
     return render_template(
         "producer_detail.html",
@@ -181,21 +593,18 @@ def producer_detail(producer_id):
 
 
 @app.route("/activity/<int:producer_id>/<path:activity_date>")
+@conditional_get
 def activity_detail(producer_id, activity_date):
     """View details for a specific activity."""
-    # Load data from CSV
-    producers_data = load_data_from_csv()
+    # Load data from the in-process cache
+    producers_data = current_dataset()
 
-    producer = next(
-        (p for p in producers_data["producers"] if p["id"] == producer_id), None
-    )
+    producer = producers_data["producers_by_id"].get(producer_id)
     if not producer:
         return "Producer not found", 404
 
     # Find the activity by date
-    activity = next(
-        (a for a in producer["recent_activities"] if a["date"] == activity_date), None
-    )
+    activity = producers_data["activities_by_key"].get((producer_id, activity_date))
 
     if not activity:
         return "Activity not found", 404
@@ -205,6 +614,246 @@ def activity_detail(producer_id, activity_date):
     return render_template("activity_detail.html", producer=producer, activity=activity)
 
 
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = ("text/html", "application/json")
+# Number of compressed bodies kept in memory
+COMPRESSED_CACHE_SIZE = 256
+
+compressed_cache = OrderedDict()
+compressed_cache_lock = threading.Lock()
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress HTML and JSON responses according to Accept-Encoding.
+
+    Compressed bodies of responses with an ETag are cached by (ETag,
+    encoding), so unchanged pages are compressed only once per dataset. The
+    encoding is appended to the ETag, since a strong validator has to differ
+    between content codings of the same resource.
+    """
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    key = (etag, encoding)
+    compressed = None
+    if etag:
+        with compressed_cache_lock:
+            compressed = compressed_cache.get(key)
+            if compressed is not None:
+                compressed_cache.move_to_end(key)
+
+    if compressed is None:
+        compressed = compress_body(body, encoding)
+        if etag:
+            with compressed_cache_lock:
+                compressed_cache[key] = compressed
+                if len(compressed_cache) > COMPRESSED_CACHE_SIZE:
+                    compressed_cache.popitem(last=False)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+# Page size limits for the JSON API
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class APIError(Exception):
+    """Invalid API request, reported to the client as a 400 JSON response."""
+
+
+@app.errorhandler(APIError)
+def handle_api_error(error):
+    return jsonify({"error": str(error)}), 400
+
+
+def encode_cursor(offset, version):
+    """Encode a list offset and the dataset version as an opaque cursor."""
+    token = f"{version}:{offset}".encode("ascii")
+    return base64.urlsafe_b64encode(token).decode("ascii")
+
+
+def decode_cursor(cursor, version):
+    """
+    Decode a cursor produced by encode_cursor, or start at 0 if there is none.
+
+    Offsets only make sense for the dataset they were issued for, so cursors
+    from before a reload are rejected instead of skipping or repeating items.
+    """
+    if not cursor:
+        return 0
+    try:
+        token = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+        cursor_version, offset = token.rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, TypeError):
+        raise APIError("Invalid cursor")
+    if offset < 0:
+        raise APIError("Invalid cursor")
+    if cursor_version != version:
+        raise APIError("Cursor is stale, the data has changed since it was issued")
+    return offset
+
+
+def _int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise APIError(f"'{name}' must be an integer")
+
+
+def paginate(items, version):
+    """
+    Slice items according to the cursor and limit query parameters.
+
+    Args:
+        items (list): All items of the listing
+        version (str): Version of the dataset the items come from
+
+    Returns:
+        tuple: (page of items, cursor for the next page or None)
+    """
+    limit = _int_arg("limit", DEFAULT_PAGE_SIZE)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise APIError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+
+    offset = decode_cursor(request.args.get("cursor"), version)
+    page = items[offset : offset + limit]
+    next_cursor = None
+    if offset + limit < len(items):
+        next_cursor = encode_cursor(offset + limit, version)
+    return page, next_cursor
+
+
+def select_fields(records):
+    """Keep only the comma-separated fields requested in the fields parameter."""
+    fields = request.args.get("fields")
+    if not fields:
+        return records
+    wanted = [field.strip() for field in fields.split(",") if field.strip()]
+    return [{field: r[field] for field in wanted if field in r} for r in records]
+
+
+def api_page(items, version):
+    """Build the JSON response for one page of items of a dataset version."""
+    page, next_cursor = paginate(items, version)
+    return jsonify({"data": select_fields(page), "next_cursor": next_cursor})
+
+
+@app.route("/api/producers")
+@conditional_get
+def api_producers():
+    """
+    List producers.
+
+    Query parameters:
+        village: Only producers from this village
+        min_health, max_health: Bounds on the healthy tree percentage
+        last_active_from, last_active_to: Bounds on last_active (YYYY-MM-DD)
+        fields: Comma-separated fields to return
+        cursor, limit: Pagination
+    """
+    producers_data = current_dataset()
+
+    village = request.args.get("village")
+    min_health = _int_arg("min_health")
+    max_health = _int_arg("max_health")
+    last_active_from = request.args.get("last_active_from")
+    last_active_to = request.args.get("last_active_to")
+
+    producers = producers_data["producers"]
+    if village:
+        producers = [p for p in producers if p["village"] == village]
+    if min_health is not None:
+        producers = [
+            p for p in producers if _healthy_percent(p["tree_health"]) >= min_health
+        ]
+    if max_health is not None:
+        producers = [
+            p for p in producers if _healthy_percent(p["tree_health"]) <= max_health
+        ]
+    # Dates are ISO formatted, so string comparison orders them correctly
+    if last_active_from:
+        producers = [
+            p
+            for p in producers
+            if isinstance(p["last_active"], str)
+            and p["last_active"] >= last_active_from
+        ]
+    if last_active_to:
+        producers = [
+            p
+            for p in producers
+            if isinstance(p["last_active"], str) and p["last_active"] <= last_active_to
+        ]
+
+    return api_page(producers, producers_data["version"])
+
+
+@app.route("/api/producers/<int:producer_id>/chat")
+@conditional_get
+def api_producer_chat(producer_id):
+    """List one producer's chat messages in conversation order."""
+    producers_data = current_dataset()
+
+    if producer_id not in producers_data["producers_by_id"]:
+        return jsonify({"error": "Producer not found"}), 404
+
+    chat_history = producers_data["chat_by_producer_id"].get(
+        producer_id, {"messages": []}
+    )
+    return api_page(chat_history["messages"], producers_data["version"])
+
+
+@app.route("/api/diagnostics")
+@conditional_get
+def api_diagnostics():
+    """List tree diagnostics, optionally for a single producer_id."""
+    producers_data = current_dataset()
+
+    producer_id = _int_arg("producer_id")
+    if producer_id is not None:
+        diagnostics_data = producers_data["diagnostics_by_producer_id"].get(
+            producer_id, []
+        )
+    else:
+        diagnostics_data = producers_data["diagnostics"]
+
+    return api_page(diagnostics_data, producers_data["version"])
+
+
 if __name__ == "__main__":
     # Create a static directory for images if it doesn't exist
     if not os.path.exists("static/img"):
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from app import load_data_from_csv
+
+
+def write_synthetic_dataset(data_dir, num_producers, num_chat_rows):
+    """
+    Write a processed_data-style CSV set with the requested number of rows.
+
+    Args:
+        data_dir (str): Directory to write the CSVs into
+        num_producers (int): Number of rows in producers.csv
+        num_chat_rows (int): Number of rows in chat_history.csv
+    """
+    rng = np.random.default_rng(42)
+
+    coop_df = pd.DataFrame(
+        [
+            {
+                "name": "Benchmark Cooperative",
+                "location": "Aboisso, Ivory Coast",
+                "established": 2008,
+                "total_members": num_producers,
+                "active_members": num_producers,
+                "total_hectares": num_producers * 5,
+                "certification": json.dumps(["Fairtrade", "UTZ"]),
+            }
+        ]
+    )
+    coop_df.to_csv(os.path.join(data_dir, "cooperative_info.csv"), index=False)
+
+    ids = np.arange(1, num_producers + 1)
+    healthy = rng.integers(60, 95, num_producers)
+    producers_df = pd.DataFrame(
+        {
+            "id": ids,
+            "producer_id": ids + 1700000000,
+            "name": [f"Producer {i}" for i in ids],
+            "village": rng.choice(
+                ["Aboisso", "Daloa", "Divo", "Soubre"], num_producers
+            ),
+            "age": rng.integers(30, 65, num_producers),
+            "join_date": "2020-01-01",
+            "farm_size_hectares": rng.uniform(2, 15, num_producers).round(1),
+            "num_trees": rng.integers(200, 1200, num_producers),
+            "phone": "+225 00000000",
+            "farm_images": "[]",
+            "yield_history": [
+                json.dumps(
+                    [
+                        {"year": 2020, "yield_kg": int(y)},
+                        {"year": 2021, "yield_kg": int(y) + 100},
+                        {"year": 2022, "yield_kg": int(y) + 200},
+                    ]
+                )
+                for y in rng.integers(1000, 5000, num_producers)
+            ],
+            "estimated_yield": rng.integers(1000, 5000, num_producers),
+            "recent_activities": json.dumps(
+                [
+                    {
+                        "date": "2025-03-08",
+                        "activity": "Data imported from producer records",
+                    }
+                ]
+            ),
+            "tree_health": [
+                json.dumps(
+                    {
+                        "healthy": int(h),
+                        "minor_issues": 100 - int(h),
+                        "needs_attention": 0,
+                    }
+                )
+                for h in healthy
+            ],
+            "soil_quality": json.dumps(
+                {
+                    "pH": 6.5,
+                    "nitrogen": "medium",
+                    "phosphorus": "high",
+                    "potassium": "low",
+                }
+            ),
+            "last_active": "2025-03-06",
+            "user_name": "Unknown",
+        }
+    )
+    producers_df.to_csv(os.path.join(data_dir, "producers.csv"), index=False)
+
+    aggregate_df = pd.DataFrame(
+        [
+            {
+                "monthly_yields": json.dumps({"months": ["Jan"], "2023": [100]}),
+                "disease_reports": json.dumps({"black_pod": 1}),
+                "training_attendance": json.dumps({"pest_management": 88}),
+                "ai_insights": "Benchmark insights",
+            }
+        ]
+    )
+    aggregate_df.to_csv(os.path.join(data_dir, "aggregate.csv"), index=False)
+
+    chat_df = pd.DataFrame(
+        {
+            "producer_id": np.sort(rng.integers(1, num_producers + 1, num_chat_rows)),
+            "date": "2025-03-06",
+            "from": rng.choice(["farmer", "advisor"], num_chat_rows),
+            "message": "Comment reconnaitre la maladie du swollen shoot ?",
+        }
+    )
+    chat_df.to_csv(os.path.join(data_dir, "chat_history.csv"), index=False)
+
+
+def load_data_with_iterrows(data_dir):
+    """The row-by-row decoder load_data_from_csv used before, kept for comparison."""
+    producers_df = pd.read_csv(os.path.join(data_dir, "producers.csv"))
+    producers = []
+    for _, row in producers_df.iterrows():
+        producer = row.to_dict()
+        producer["yield_history"] = json.loads(producer["yield_history"])
+        producer["tree_health"] = json.loads(producer["tree_health"])
+        producer["soil_quality"] = json.loads(producer["soil_quality"])
+        producer["recent_activities"] = json.loads(producer["recent_activities"])
+        if "profile_image" in producer:
+            del producer["profile_image"]
+        producer["farm_images"] = []
+        producers.append(producer)
+
+    chat_df = pd.read_csv(os.path.join(data_dir, "chat_history.csv"))
+    chat_history = []
+    for producer_id, group in chat_df.groupby("producer_id"):
+        messages = []
+        for _, row in group.iterrows():
+            messages.append(
+                {"date": row["date"], "from": row["from"], "message": row["message"]}
+            )
+        chat_history.append({"producer_id": producer_id, "messages": messages})
+
+    return producers, chat_history
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """Time the current and the iterrows-based loaders on a synthetic dataset."""
+    num_producers = int(os.environ.get("BENCH_PRODUCERS", 100_000))
+    num_chat_rows = int(os.environ.get("BENCH_CHAT_ROWS", 5_000_000))
+    skip_legacy = os.environ.get("BENCH_SKIP_LEGACY") == "1"
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(
+            f"Writing {num_producers} producers and {num_chat_rows} chat rows "
+            f"to {data_dir}..."
+        )
+        write_synthetic_dataset(data_dir, num_producers, num_chat_rows)
+
+        current = time_call(load_data_from_csv, data_dir)
+        print(f"load_data_from_csv (columnar): {current:.2f}s")
+
+        if not skip_legacy:
+            legacy = time_call(load_data_with_iterrows, data_dir)
+            print(f"iterrows decoder:              {legacy:.2f}s")
+            print(f"Speedup: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from moto import mock_aws
+
+from data_extraction import S3DataExtractor
+
+BUCKET_NAME = "benchmark-producers"
+
+
+def populate_bucket(s3_client, num_producers, num_keys):
+    """
+    Fill the bucket with num_keys photos spread evenly over num_producers.
+
+    Args:
+        s3_client: boto3 S3 client
+        num_producers (int): Number of top-level producer folders
+        num_keys (int): Total number of objects to create
+    """
+
+    def put(i):
+        producer = f"{1700000000 + i % num_producers}"
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key=f"{producer}/IMG_{i:08d}.jpg", Body=b""
+        )
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(put, range(num_keys)))
+
+
+def list_producers_full_scan(bucket):
+    """The previous list_producers: walk every object in the bucket."""
+    producers = set()
+    for obj in bucket.objects.all():
+        path_parts = obj.key.split("/")
+        if len(path_parts) > 1:
+            producers.add(path_parts[0])
+    return sorted(producers)
+
+
+def main():
+    """Compare producer discovery by full scan and by delimiter listing."""
+    num_producers = int(os.environ.get("BENCH_PRODUCERS", 40))
+    num_keys = int(os.environ.get("BENCH_KEYS", 1_000_000))
+
+    # moto only needs credentials to be present
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+
+        print(f"Creating {num_keys} keys under {num_producers} producers...")
+        populate_bucket(s3_client, num_producers, num_keys)
+
+        extractor = S3DataExtractor(
+            BUCKET_NAME, local_output_dir=os.path.join("/tmp", BUCKET_NAME)
+        )
+
+        start = time.perf_counter()
+        delimited = extractor.list_producers()
+        delimiter_time = time.perf_counter() - start
+        print(f"Delimiter listing: {delimiter_time:.2f}s ({len(delimited)} producers)")
+
+        start = time.perf_counter()
+        scanned = list_producers_full_scan(extractor.bucket)
+        scan_time = time.perf_counter() - start
+        print(f"Full scan:         {scan_time:.2f}s ({len(scanned)} producers)")
+
+        assert delimited == scanned
+        print(f"Speedup: {scan_time / delimiter_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,26 @@
 import os
 import boto3
+from botocore.config import Config
 import json
 import pandas as pd
 from datetime import datetime
 from collections import defaultdict
-from PIL import Image
+from itertools import islice
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from PIL import Image, ImageOps, features
 import io
+import codecs
 import logging
+import threading
 from dotenv import load_dotenv
 
+from producer_records import iter_producer_records, read_producer_data
+
 # Load environment variables from .env file
 # Try looking in different directories if needed
 if os.path.exists(".env"):
@@ -28,12 +40,178 @@ logger = logging.getLogger(__name__)
 logger.info(f"S3_BUCKET_NAME: {os.environ.get('S3_BUCKET_NAME')}")
 logger.info(f"AWS_REGION: {os.environ.get('AWS_REGION')}")
 
+# File extensions treated as tree images
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif")
+
+# File extensions treated as chat history (JSON, or one JSON value per line)
+CHAT_EXTENSIONS = (".json", ".ndjson", ".jsonl")
+
+# Size of the reads used when streaming S3 objects
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Web derivatives generated for each tree image: name -> (max size, format)
+IMAGE_DERIVATIVES = {
+    "thumb": ((320, 320), "JPEG"),
+    "preview": ((1280, 1280), "WEBP"),
+}
+
+# File extension of the derivatives saved in each format
+DERIVATIVE_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+
+def derivative_format(name):
+    """
+    Return the (format, file extension) a derivative is saved in.
+
+    WebP derivatives are saved as JPEG when Pillow has no WebP support, and
+    then also get the .jpg extension.
+    """
+    image_format = IMAGE_DERIVATIVES[name][1]
+    if image_format == "WEBP" and not features.check("webp"):
+        image_format = "JPEG"
+    return image_format, DERIVATIVE_EXTENSIONS[image_format]
+
+
+def _render_derivatives(image_data, output_paths):
+    """
+    Decode an image once and save resized derivatives of it.
+
+    Runs in a worker process. JPEGs are decoded in draft mode, which lets the
+    decoder scale down by up to 8x while decoding instead of producing the
+    full-resolution bitmap first.
+
+    Args:
+        image_data (bytes): Encoded source image
+        output_paths (dict): Maps derivative names in IMAGE_DERIVATIVES to
+            the paths to write them to
+
+    Returns:
+        dict: The output_paths that were written
+    """
+    largest = max(IMAGE_DERIVATIVES[name][0] for name in output_paths)
+    image = Image.open(io.BytesIO(image_data))
+    image.draft("RGB", largest)
+    # Apply the camera orientation so phone photos are not shown sideways
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    for name, path in output_paths.items():
+        size = IMAGE_DERIVATIVES[name][0]
+        image_format, _ = derivative_format(name)
+        derivative = image.copy()
+        derivative.thumbnail(size, Image.LANCZOS)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        derivative.save(tmp_path, format=image_format, quality=80)
+        os.replace(tmp_path, path)
+
+    return output_paths
+
+
+def iter_json_stream(chunks):
+    """
+    Incrementally parse a stream of JSON text.
+
+    Accepts a single JSON value, a JSON array or a sequence of whitespace
+    separated values such as NDJSON. Elements of top-level arrays are yielded
+    one at a time, so only the element being parsed is held in memory rather
+    than the whole document.
+
+    Args:
+        chunks (iterable): Chunks of UTF-8 encoded bytes
+
+    Yields:
+        Each top-level value, or each element of a top-level array
+
+    Raises:
+        json.JSONDecodeError: If the stream is not valid JSON
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array = False
+
+    def read_more(min_size):
+        # Append decoded text until at least min_size characters are buffered
+        nonlocal buffer, pos, eof
+        buffer = buffer[pos:]
+        pos = 0
+        while not eof and len(buffer) < min_size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+                buffer += text_decoder.decode(b"", final=True)
+            else:
+                buffer += text_decoder.decode(chunk)
+        return not eof or bool(buffer)
+
+    read_more(1)
+    while True:
+        # Skip whitespace and the array separators between values
+        while pos < len(buffer) and (
+            buffer[pos].isspace() or (in_array and buffer[pos] == ",")
+        ):
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                break
+            read_more(1)
+            continue
+
+        if not in_array and buffer[pos] == "[":
+            in_array = True
+            pos += 1
+            continue
+        if in_array and buffer[pos] == "]":
+            in_array = False
+            pos += 1
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The value is incomplete; at least double the buffered text so a
+            # large value is not re-parsed once per chunk
+            read_more(2 * (len(buffer) - pos) + 1)
+            continue
+
+        if (
+            not eof
+            and isinstance(value, (int, float))
+            and (end == len(buffer) or buffer[end] not in " \t\r\n,]}")
+        ):
+            # A number cut off by the chunk boundary may continue in the next one
+            read_more(len(buffer) - pos + 1)
+            continue
+
+        pos = end
+        yield value
+
+    if in_array:
+        raise json.JSONDecodeError("Unterminated array", buffer, pos)
+
+
+def json_serial(obj):
+    """Convert datetime objects to strings for JSON serialization."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
 
 class S3DataExtractor:
     """Class to extract and organize producer data from S3 bucket."""
 
     def __init__(
-        self, bucket_name, aws_region="us-east-1", local_output_dir="./extracted_data"
+        self,
+        bucket_name,
+        aws_region="us-east-1",
+        local_output_dir="./extracted_data",
+        max_workers=1,
+        max_object_workers=1,
     ):
         """
         Initialize the extractor with bucket details and output location.
@@ -42,9 +220,22 @@ class S3DataExtractor:
             bucket_name (str): Name of the S3 bucket
             aws_region (str): AWS region of the bucket
             local_output_dir (str): Directory to save data locally (if needed)
+            max_workers (int): Number of producers extracted concurrently
+            max_object_workers (int): Number of concurrent S3 object requests
+                per producer
         """
         self.bucket_name = bucket_name
-        self.s3_client = boto3.client("s3", region_name=aws_region)
+        self.max_workers = max(1, max_workers)
+        self.max_object_workers = max(1, max_object_workers)
+        # The client is shared by all worker threads, so size its connection
+        # pool for every request that can be in flight at once
+        self.s3_client = boto3.client(
+            "s3",
+            region_name=aws_region,
+            config=Config(
+                max_pool_connections=max(10, self.max_workers * self.max_object_workers)
+            ),
+        )
         self.s3_resource = boto3.resource("s3", region_name=aws_region)
         self.bucket = self.s3_resource.Bucket(bucket_name)
         self.local_output_dir = local_output_dir
@@ -53,6 +244,70 @@ class S3DataExtractor:
         if not os.path.exists(local_output_dir):
             os.makedirs(local_output_dir)
 
+        # Image metadata from earlier runs, keyed by S3 key and checked by ETag
+        self.metadata_cache_path = os.path.join(
+            local_output_dir, "image_metadata_cache.json"
+        )
+        self._metadata_cache = self._load_metadata_cache()
+        self._metadata_cache_lock = threading.Lock()
+
+    def _load_metadata_cache(self):
+        """Load the image metadata cache, or start empty if it cannot be read."""
+        if not os.path.exists(self.metadata_cache_path):
+            return {}
+        try:
+            with open(self.metadata_cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable metadata cache: {str(e)}")
+            return {}
+
+    def save_metadata_cache(self, keys=None):
+        """
+        Write the image metadata cache so the next run can reuse it.
+
+        Args:
+            keys (set, optional): Keys to keep. Entries for other keys, such
+                as images deleted from the bucket, are dropped.
+        """
+        with self._metadata_cache_lock:
+            if keys is not None:
+                self._metadata_cache = {
+                    key: entry
+                    for key, entry in self._metadata_cache.items()
+                    if key in keys
+                }
+            cache = dict(self._metadata_cache)
+        tmp_path = f"{self.metadata_cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.metadata_cache_path)
+
+    def _get_image_metadata(self, obj):
+        """
+        Return the custom metadata of an image object.
+
+        S3 only returns user metadata from HEAD/GET, so the result is cached
+        under the object's key together with its ETag. The object is only
+        HEADed again if its ETag has changed since it was cached.
+
+        Args:
+            obj (dict): Object summary from a listing (Key and ETag)
+        """
+        key = obj["Key"]
+        etag = obj.get("ETag")
+        cached = self._metadata_cache.get(key)
+        if cached is not None and etag and cached["etag"] == etag:
+            return cached["metadata"]
+
+        metadata = self.s3_client.head_object(Bucket=self.bucket_name, Key=key).get(
+            "Metadata", {}
+        )
+        if etag:
+            with self._metadata_cache_lock:
+                self._metadata_cache[key] = {"etag": etag, "metadata": metadata}
+        return metadata
+
     def list_producers(self):
         """
         List all producer folders in the bucket.
@@ -60,67 +315,67 @@ class S3DataExtractor:
         Returns:
             list: List of producer folder names
         """
-        producers = set()
+        producers = []
         try:
-            # List all objects in the bucket
-            objects = self.bucket.objects.all()
-
-            # Extract unique producer folder names
-            for obj in objects:
-                path_parts = obj.key.split("/")
-                if len(path_parts) > 1:  # Ensure it's inside a folder
-                    producers.add(path_parts[0])
+            # List only the top-level "folders": S3 rolls every key under a
+            # producer up into one CommonPrefixes entry, so the cost depends
+            # on the number of producers rather than the number of photos
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name, Delimiter="/"):
+                for prefix in page.get("CommonPrefixes", []):
+                    producers.append(prefix["Prefix"].rstrip("/"))
 
             logger.info(f"Found {len(producers)} producer directories")
-            return sorted(list(producers))
+            return sorted(producers)
 
         except Exception as e:
             logger.error(f"Error listing producers: {str(e)}")
             return []
 
-    def extract_chat_history(self, producer_folder):
+    def _list_objects(self, prefix):
+        """
+        List the objects under a prefix.
+
+        Uses the thread-safe S3 client rather than the bucket resource so it can
+        be called from worker threads.
+
+        Yields:
+            dict: Object summaries with Key, LastModified, ETag and Size
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def _map_objects(self, func, items):
+        """Apply func to items, concurrently if max_object_workers > 1."""
+        if self.max_object_workers == 1 or len(items) < 2:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_object_workers) as executor:
+            return list(executor.map(func, items))
+
+    def extract_chat_history(self, producer_folder, chat_keys=None):
         """
         Extract chat history for a specific producer.
 
         Args:
             producer_folder (str): Producer folder name
+            chat_keys (list, optional): Chat file keys to read instead of
+                listing the producer's chat_history folder
 
         Returns:
             list: List of chat messages with metadata
         """
-        chat_history = []
-
         try:
-            # Look for JSON files in the chat_history subfolder of the producer folder
-            chat_prefix = f"{producer_folder}/chat_history/"
-            for obj in self.bucket.objects.filter(Prefix=chat_prefix):
-                if obj.key.endswith(".json"):
-                    logger.info(f"Found chat history file: {obj.key}")
-                    content = (
-                        self.s3_client.get_object(Bucket=self.bucket_name, Key=obj.key)[
-                            "Body"
-                        ]
-                        .read()
-                        .decode("utf-8")
-                    )
-                    try:
-                        chat_data = json.loads(content)
-                        if isinstance(chat_data, list):
-                            chat_history.extend(chat_data)
-                        elif isinstance(chat_data, dict):
-                            chat_history.append(chat_data)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Error parsing JSON from {obj.key}: {str(e)}")
-
-            # Sort by timestamp if available
-            if (
-                chat_history
-                and isinstance(chat_history[0], dict)
-                and "timestamp" in chat_history[0]
-            ):
-                chat_history.sort(key=lambda x: x.get("timestamp", ""))
-
-            return chat_history
+            if chat_keys is None:
+                # Look for JSON files in the producer's chat_history subfolder
+                chat_prefix = f"{producer_folder}/chat_history/"
+                chat_keys = [
+                    obj["Key"]
+                    for obj in self._list_objects(chat_prefix)
+                    if obj["Key"].endswith(CHAT_EXTENSIONS)
+                ]
+
+            return self._fetch_chat_history(chat_keys)
 
         except Exception as e:
             logger.error(
@@ -128,12 +383,72 @@ class S3DataExtractor:
             )
             return []
 
-    def extract_tree_images(self, producer_folder):
+    def _fetch_chat_history(self, chat_keys):
+        """
+        Read and sort the messages of the given chat files.
+
+        Unlike extract_chat_history, errors fetching a file are raised, so a
+        producer is not recorded in the manifest with messages missing.
+        Files that are not valid JSON are logged and skipped.
+        """
+        chat_history = []
+        for messages in self._map_objects(self._read_chat_file, chat_keys):
+            chat_history.extend(messages)
+        return self._sort_chat_history(chat_history)
+
+    @staticmethod
+    def _sort_chat_history(chat_history):
+        """Sort chat messages by timestamp if available."""
+        if (
+            chat_history
+            and isinstance(chat_history[0], dict)
+            and "timestamp" in chat_history[0]
+        ):
+            chat_history.sort(key=lambda x: x.get("timestamp", ""))
+        return chat_history
+
+    def iter_chat_messages(self, key):
+        """
+        Stream the messages of one chat history file.
+
+        The object body is parsed as it is read, without first loading the
+        whole file into memory. Files may hold a JSON array of messages, a
+        single message object or one message per line (NDJSON).
+
+        Yields:
+            Chat messages in file order
+
+        Raises:
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        logger.info(f"Found chat history file: {key}")
+        body = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)["Body"]
+        try:
+            yield from iter_json_stream(body.iter_chunks(STREAM_CHUNK_SIZE))
+        finally:
+            body.close()
+
+    def _read_chat_file(self, key):
+        """
+        Read the messages of one chat history file.
+
+        Returns:
+            list: Messages, or an empty list if the file is not valid JSON
+        """
+        try:
+            return list(self.iter_chat_messages(key))
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON from {key}: {str(e)}")
+            return []
+
+    def extract_tree_images(self, producer_folder, image_objects=None):
         """
         Extract tree images for a specific producer.
 
         Args:
             producer_folder (str): Producer folder name
+            image_objects (list, optional): Object summaries (Key, ETag,
+                LastModified) to use instead of listing the producer's folder
 
         Returns:
             dict: Dictionary mapping image paths to metadata
@@ -141,29 +456,31 @@ class S3DataExtractor:
         image_data = {}
 
         try:
-            # Look for images directly in the producer's folder
-            image_extensions = (".jpg", ".jpeg", ".png", ".gif")
-
-            # Look in the main producer folder
-            for obj in self.bucket.objects.filter(Prefix=f"{producer_folder}/"):
-                if obj.key.lower().endswith(image_extensions):
-                    # Extract metadata
-                    metadata = self.s3_client.head_object(
-                        Bucket=self.bucket_name, Key=obj.key
-                    ).get("Metadata", {})
-
-                    # Extract creation date and filename
-                    filename = os.path.basename(obj.key)
-                    created_date = obj.last_modified
-
-                    # Store path and metadata
-                    image_data[obj.key] = {
-                        "filename": filename,
-                        "created_date": created_date,
-                        "metadata": metadata,
-                        "s3_path": f"s3://{self.bucket_name}/{obj.key}",
-                    }
-                    logger.info(f"Found image: {filename} in {producer_folder}")
+            if image_objects is None:
+                # Look for images directly in the producer's folder
+                image_objects = [
+                    obj
+                    for obj in self._list_objects(f"{producer_folder}/")
+                    if obj["Key"].lower().endswith(IMAGE_EXTENSIONS)
+                ]
+
+            # Extract metadata, from the cache when the image is unchanged
+            metadata_list = self._map_objects(self._get_image_metadata, image_objects)
+
+            for obj, metadata in zip(image_objects, metadata_list):
+                # Extract creation date and filename
+                filename = os.path.basename(obj["Key"])
+                created_date = obj["LastModified"]
+
+                # Store path and metadata
+                image_data[obj["Key"]] = {
+                    "filename": filename,
+                    "created_date": created_date,
+                    "metadata": metadata,
+                    "s3_path": f"s3://{self.bucket_name}/{obj['Key']}",
+                    "etag": obj.get("ETag"),
+                }
+                logger.info(f"Found image: {filename} in {producer_folder}")
 
             return image_data
 
@@ -173,17 +490,26 @@ class S3DataExtractor:
             )
             return {}
 
-    def download_image(self, s3_key, local_path=None):
+    def download_image(self, s3_key, local_path=None, raw=False):
         """
         Download an image from S3.
 
         Args:
             s3_key (str): S3 object key
             local_path (str, optional): Path to save the image locally
+            raw (bool): Stream the object to local_path unchanged, in chunks,
+                without decoding or re-encoding it. Open the file with PIL
+                later if the pixels are needed.
 
         Returns:
-            PIL.Image or None: Image object if successful, None if failed
+            PIL.Image or None: Image object if successful, None if failed.
+            In raw mode, the local path instead of an image.
         """
+        if raw:
+            if not local_path:
+                raise ValueError("raw mode requires a local_path")
+            return self._download_raw(s3_key, local_path)
+
         try:
             # Get the image data
             response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
@@ -204,34 +530,424 @@ class S3DataExtractor:
             logger.error(f"Error downloading image {s3_key}: {str(e)}")
             return None
 
-    def extract_all_producer_data(self):
+    def _download_raw(self, s3_key, local_path):
+        """
+        Stream an S3 object to disk without holding it in memory.
+
+        Returns:
+            str or None: local_path if successful, None if failed
+        """
+        tmp_path = f"{local_path}.part"
+        try:
+            os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+            body = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)[
+                "Body"
+            ]
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in body.iter_chunks(STREAM_CHUNK_SIZE):
+                        f.write(chunk)
+            finally:
+                body.close()
+
+            # Only a complete download replaces the file
+            os.replace(tmp_path, local_path)
+            return local_path
+
+        except Exception as e:
+            logger.error(f"Error downloading image {s3_key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def derivative_paths(self, s3_key, etag, output_dir):
+        """
+        Return where the derivatives of one version of an image are stored.
+
+        The ETag is part of the filename, so a changed image gets new files
+        and unchanged images map to derivatives that already exist.
+        """
+        base, _ = os.path.splitext(s3_key)
+        version = (etag or "").strip('"')
+        paths = {}
+        for name in IMAGE_DERIVATIVES:
+            _, extension = derivative_format(name)
+            filename = f"{base}.{version}.{name}.{extension}"
+            paths[name] = os.path.join(output_dir, filename)
+        return paths
+
+    def create_image_derivatives(self, images, output_dir, max_processes=None):
+        """
+        Generate thumbnails and web previews for images.
+
+        Images are downloaded concurrently with max_object_workers threads
+        over the pooled S3 client, and decoded and resized in a process pool.
+        Derivatives that already exist for the image's current ETag are not
+        generated again.
+
+        Args:
+            images (list): (S3 key, ETag) pairs, e.g. from tree_images entries
+            output_dir (str): Directory to write the derivatives to
+            max_processes (int, optional): Size of the process pool, defaults
+                to the number of CPUs
+
+        Returns:
+            dict: Maps S3 keys to their derivative paths by derivative name
+        """
+        results = {}
+        pending = []
+        max_processes = max_processes or os.cpu_count() or 1
+
+        def fetch(image):
+            # Returns the derivative paths, and the image data if they are missing
+            s3_key, etag = image
+            try:
+                if not etag:
+                    etag = self.s3_client.head_object(
+                        Bucket=self.bucket_name, Key=s3_key
+                    )["ETag"]
+                paths = self.derivative_paths(s3_key, etag, output_dir)
+                if all(os.path.exists(path) for path in paths.values()):
+                    return paths, None
+
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name, Key=s3_key
+                )
+                return paths, response["Body"].read()
+            except Exception as e:
+                logger.error(f"Error fetching image {s3_key}: {str(e)}")
+                return None
+
+        with ProcessPoolExecutor(max_workers=max_processes) as executor:
+            fetched_images = self._map_completed(fetch, images, self.max_object_workers)
+            for (s3_key, _), fetched in fetched_images:
+                if fetched is None:
+                    continue
+                paths, image_data = fetched
+                if image_data is None:
+                    results[s3_key] = paths
+                    continue
+
+                future = executor.submit(_render_derivatives, image_data, paths)
+                pending.append((s3_key, future))
+
+                # Bound the number of downloaded images waiting in memory
+                if len(pending) >= 2 * max_processes:
+                    self._collect_derivatives(pending, results)
+
+            self._collect_derivatives(pending, results)
+
+        logger.info(f"Derivatives ready for {len(results)} of {len(images)} images")
+        return results
+
+    @staticmethod
+    def _collect_derivatives(pending, results):
+        wait([future for _, future in pending])
+        for s3_key, future in pending:
+            try:
+                results[s3_key] = future.result()
+            except Exception as e:
+                logger.error(f"Error creating derivatives for {s3_key}: {str(e)}")
+        pending.clear()
+
+    def extract_all_producer_data(self, existing_data=None):
         """
         Extract data for all producers.
 
+        Args:
+            existing_data (dict, optional): Output of a previous run. When
+                given, extraction is incremental: objects whose ETag matches
+                the manifest of the previous run are not fetched again, and
+                new or changed objects are merged into the existing data.
+
         Returns:
             dict: Dictionary mapping producer names to their data (chat history and images)
         """
-        all_data = {}
+        # Producers finish in any order; sort so the output is deterministic
+        return dict(sorted(self.iter_producer_data(existing_data)))
+
+    def iter_producer_data(self, existing_data=None):
+        """
+        Extract producers concurrently, yielding each as soon as it is done.
+
+        Producers are yielded in completion order, so a slow producer does not
+        hold back the ones after it. At most twice max_workers producers are
+        in flight, which bounds how many finished results wait for the
+        consumer. A producer that fails is skipped, or in incremental mode
+        yielded with its data from existing_data, and is extracted again on
+        the next run. The extraction manifest and metadata cache are saved
+        once the iteration completes, and the metadata of images that are no
+        longer in the bucket is dropped from the cache.
+
+        Args:
+            existing_data (dict, optional): See extract_all_producer_data
+
+        Yields:
+            tuple: (producer name, producer data)
+        """
         producers = self.list_producers()
 
-        for producer in producers:
-            logger.info(f"Processing producer: {producer}")
+        manifest_by_producer = defaultdict(dict)
+        if existing_data is None:
+            extract = self._extract_producer
+        else:
+            for key, entry in self._load_manifest().items():
+                manifest_by_producer[key.split("/")[0]][key] = entry
+
+            def extract(producer):
+                return self._extract_producer_incremental(
+                    producer,
+                    existing_data.get(producer),
+                    manifest_by_producer.get(producer, {}),
+                )
+
+        # Record what was extracted so the next run can be incremental
+        manifest = {}
+        extracted = 0
+        failed_producers = set()
+        results = self._map_completed(extract, producers, self.max_workers)
+        try:
+            for producer, (producer_data, producer_manifest) in results:
+                if producer_data is None:
+                    failed_producers.add(producer)
+                    # Keep the old entries so a failed producer is retried in
+                    # full, and its data from the last run rather than dropping it
+                    producer_manifest = manifest_by_producer.get(producer, {})
+                    if existing_data and producer in existing_data:
+                        yield producer, existing_data[producer]
+                    manifest.update(producer_manifest)
+                    continue
+
+                manifest.update(producer_manifest)
+                extracted += 1
+                yield producer, producer_data
+        finally:
+            # Stop the workers if the consumer stops iterating early
+            results.close()
+
+        try:
+            self.save_manifest(manifest)
+        except OSError as e:
+            logger.error(f"Error saving extraction manifest: {str(e)}")
+
+        # Keep the metadata of the images listed in this run, and of failed
+        # producers whose images may not have been listed
+        cached_keys = {
+            key
+            for key in self._metadata_cache
+            if key in manifest or key.split("/")[0] in failed_producers
+        }
+        try:
+            self.save_metadata_cache(cached_keys)
+        except OSError as e:
+            logger.error(f"Error saving image metadata cache: {str(e)}")
+
+        logger.info(
+            f"Completed extraction for {extracted} of {len(producers)} producers"
+        )
+
+    @staticmethod
+    def _map_completed(func, items, max_workers):
+        """
+        Apply func to items on a thread pool, yielding in completion order.
+
+        At most twice max_workers items are in flight, which bounds how many
+        finished results wait for the consumer.
+
+        Args:
+            func (callable): Function called with each item
+            items (iterable): Items to apply func to
+            max_workers (int): Number of threads, 1 to run in this thread
+
+        Yields:
+            tuple: (item, result of func)
+        """
+        if max_workers == 1:
+            for item in items:
+                yield item, func(item)
+            return
+
+        max_pending = 2 * max_workers
+        remaining = iter(items)
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while True:
+                for item in islice(remaining, max_pending - len(pending)):
+                    pending[executor.submit(func, item)] = item
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _list_producer_objects(self, producer):
+        """
+        List a producer's folder once and split it into chat files and images.
+
+        Returns:
+            tuple: (dict mapping keys to object summaries, list of chat file
+            keys, list of image object summaries)
+        """
+        objects = {obj["Key"]: obj for obj in self._list_objects(f"{producer}/")}
+        chat_prefix = f"{producer}/chat_history/"
+        chat_keys = [
+            key
+            for key in objects
+            if key.startswith(chat_prefix) and key.endswith(CHAT_EXTENSIONS)
+        ]
+        image_objects = [
+            obj
+            for key, obj in objects.items()
+            if key.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        return objects, chat_keys, image_objects
+
+    @staticmethod
+    def _manifest_entries(objects):
+        """Build manifest entries (ETag, LastModified) for listed objects."""
+        return {
+            key: {
+                "etag": obj["ETag"],
+                "last_modified": obj["LastModified"].isoformat(),
+            }
+            for key, obj in objects.items()
+        }
+
+    def _extract_producer(self, producer):
+        """
+        Extract the chat history and images of one producer.
+
+        The producer's folder is listed once and the listing feeds both the
+        chat history and the image extraction.
+
+        Returns:
+            tuple: (producer data or None if extraction failed, manifest
+            entries for the producer's objects)
+        """
+        logger.info(f"Processing producer: {producer}")
+
+        try:
+            objects, chat_keys, image_objects = self._list_producer_objects(producer)
 
             # Extract data for this producer
-            chat_history = self.extract_chat_history(producer)
-            tree_images = self.extract_tree_images(producer)
-
-            # Store in the result dictionary
-            all_data[producer] = {
-                "producer_id": producer,
-                "chat_history": chat_history,
-                "tree_images": tree_images,
-                "total_images": len(tree_images),
-                "total_chat_messages": len(chat_history),
+            chat_history = self._fetch_chat_history(chat_keys)
+            tree_images = self.extract_tree_images(producer, image_objects)
+        except Exception as e:
+            logger.error(f"Error processing producer {producer}: {str(e)}")
+            return None, {}
+
+        return (
+            self._producer_record(producer, chat_history, tree_images),
+            self._manifest_entries(objects),
+        )
+
+    @staticmethod
+    def _producer_record(producer, chat_history, tree_images):
+        return {
+            "producer_id": producer,
+            "chat_history": chat_history,
+            "tree_images": tree_images,
+            "total_images": len(tree_images),
+            "total_chat_messages": len(chat_history),
+        }
+
+    def _extract_producer_incremental(self, producer, previous, manifest):
+        """
+        Bring one producer's data up to date with the bucket.
+
+        Chat files that were only added are fetched and appended to the
+        previous chat history. If a chat file changed or was deleted, the
+        producer's chat history is rebuilt from all of its files, since
+        messages are not tracked per file. Images are merged per key.
+
+        Args:
+            producer (str): Producer folder name
+            previous (dict or None): The producer's data from the last run
+            manifest (dict): The producer's manifest entries from the last run
+
+        Returns:
+            tuple: (producer data or None if extraction failed, new manifest
+            entries for the producer's objects)
+        """
+        logger.info(f"Processing producer: {producer}")
+
+        try:
+            objects, chat_keys, image_objects = self._list_producer_objects(producer)
+            chat_prefix = f"{producer}/chat_history/"
+
+            def is_unchanged(key):
+                return key in manifest and manifest[key]["etag"] == objects[key]["ETag"]
+
+            if previous is None or not manifest:
+                # Nothing to merge with, so every object is fetched
+                previous = self._producer_record(producer, [], {})
+                manifest = {}
+
+            # Chat history
+            new_chat_keys = [key for key in chat_keys if key not in manifest]
+            chat_rewritten = any(
+                key in manifest and not is_unchanged(key) for key in chat_keys
+            ) or any(
+                key.startswith(chat_prefix) and key not in objects for key in manifest
+            )
+            if chat_rewritten:
+                chat_history = self._fetch_chat_history(chat_keys)
+            else:
+                chat_history = list(previous["chat_history"])
+                if new_chat_keys:
+                    chat_history.extend(self._fetch_chat_history(new_chat_keys))
+                    self._sort_chat_history(chat_history)
+
+            # Tree images
+            tree_images = {
+                key: image
+                for key, image in previous["tree_images"].items()
+                if key in objects and is_unchanged(key)
             }
+            changed_images = [
+                obj for obj in image_objects if obj["Key"] not in tree_images
+            ]
+            if changed_images:
+                tree_images.update(self.extract_tree_images(producer, changed_images))
+        except Exception as e:
+            logger.error(f"Error processing producer {producer}: {str(e)}")
+            return None, {}
+
+        return (
+            self._producer_record(producer, chat_history, tree_images),
+            self._manifest_entries(objects),
+        )
 
-        logger.info(f"Completed extraction for {len(producers)} producers")
-        return all_data
+    @property
+    def manifest_path(self):
+        return os.path.join(self.local_output_dir, "extraction_manifest.json")
+
+    def _load_manifest(self):
+        """Load the manifest of the previous incremental run, if any."""
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable extraction manifest: {str(e)}")
+            return {}
+
+    def save_manifest(self, manifest):
+        """
+        Save the (key, ETag, LastModified) manifest of the objects extracted.
+
+        Args:
+            manifest (dict): Maps object keys to their etag and last_modified
+        """
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
 
     def save_as_json(self, data, filename="producer_data.json"):
         """
@@ -246,31 +962,61 @@ class S3DataExtractor:
         """
         file_path = os.path.join(self.local_output_dir, filename)
 
-        # Convert datetime objects to strings for JSON serialization
-        def json_serial(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Type {type(obj)} not serializable")
-
         with open(file_path, "w") as f:
             json.dump(data, f, default=json_serial, indent=2)
 
         logger.info(f"Data saved to {file_path}")
         return file_path
 
+    def save_as_ndjson(self, producer_items, filename="producer_data.ndjson"):
+        """
+        Save producer data as JSON lines, one producer per line.
+
+        Each producer is written as soon as producer_items yields it, so this
+        can consume iter_producer_data() directly without the whole data set
+        being held in memory. The file is renamed into place once complete.
+
+        Args:
+            producer_items (iterable): (producer name, producer data) pairs
+            filename (str): Filename to save as
+
+        Returns:
+            str: Path to the saved file
+        """
+        file_path = os.path.join(self.local_output_dir, filename)
+        tmp_path = f"{file_path}.tmp"
+
+        count = 0
+        with open(tmp_path, "w") as f:
+            for _, producer_data in producer_items:
+                f.write(json.dumps(producer_data, default=json_serial))
+                f.write("\n")
+                count += 1
+        os.replace(tmp_path, file_path)
+
+        logger.info(f"Data for {count} producers saved to {file_path}")
+        return file_path
+
     def create_analysis_dataframes(self, producer_data):
         """
         Create pandas DataFrames for analysis.
 
         Args:
-            producer_data (dict): Extracted producer data
+            producer_data (dict or iterable): Extracted producer data, or
+                (producer name, producer data) pairs such as those of
+                iter_producer_records(), which are consumed in a single pass
 
         Returns:
             dict: Dictionary containing various DataFrames
         """
-        # Producer summary DataFrame
+        if isinstance(producer_data, dict):
+            producer_data = producer_data.items()
+
         producer_summary = []
-        for producer_id, data in producer_data.items():
+        messages = []
+        images = []
+        for producer_id, data in producer_data:
+            # Producer summary
             producer_summary.append(
                 {
                     "producer_id": producer_id,
@@ -279,11 +1025,7 @@ class S3DataExtractor:
                 }
             )
 
-        producer_df = pd.DataFrame(producer_summary)
-
-        # Chat messages DataFrame
-        messages = []
-        for producer_id, data in producer_data.items():
+            # Chat messages
             for msg in data["chat_history"]:
                 msg_data = {
                     "producer_id": producer_id,
@@ -309,11 +1051,7 @@ class S3DataExtractor:
 
                 messages.append(msg_data)
 
-        messages_df = pd.DataFrame(messages)
-
-        # Images DataFrame
-        images = []
-        for producer_id, data in producer_data.items():
+            # Images
             for image_path, image_data in data["tree_images"].items():
                 image_info = {
                     "producer_id": producer_id,
@@ -331,6 +1069,8 @@ class S3DataExtractor:
 
                 images.append(image_info)
 
+        producer_df = pd.DataFrame(producer_summary)
+        messages_df = pd.DataFrame(messages)
         images_df = pd.DataFrame(images)
 
         return {
@@ -346,6 +1086,12 @@ def main():
     BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
     OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "./producer_data")
     AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+    MAX_WORKERS = int(os.environ.get("EXTRACT_MAX_WORKERS", "8"))
+    MAX_OBJECT_WORKERS = int(os.environ.get("EXTRACT_MAX_OBJECT_WORKERS", "4"))
+    INCREMENTAL = os.environ.get("EXTRACT_INCREMENTAL", "").lower() in ("1", "true")
+    DERIVATIVES_DIR = os.environ.get("DERIVATIVES_DIR")
+    # "json" writes producer_data.json, "ndjson" writes producer_data.ndjson
+    DATA_FORMAT = os.environ.get("PRODUCER_DATA_FORMAT", "json")
 
     # Validate required environment variables
     if not BUCKET_NAME:
@@ -356,25 +1102,71 @@ def main():
 
     # Create extractor
     extractor = S3DataExtractor(
-        BUCKET_NAME, aws_region=AWS_REGION, local_output_dir=OUTPUT_DIR
+        BUCKET_NAME,
+        aws_region=AWS_REGION,
+        local_output_dir=OUTPUT_DIR,
+        max_workers=MAX_WORKERS,
+        max_object_workers=MAX_OBJECT_WORKERS,
     )
 
-    # Extract all data
-    producer_data = extractor.extract_all_producer_data()
-
-    # Save as JSON
-    extractor.save_as_json(producer_data)
+    # Extract all data, reusing the previous output in incremental mode
+    data_filename = f"producer_data.{DATA_FORMAT}"
+    existing_data = {} if INCREMENTAL else None
+    existing_path = os.path.join(OUTPUT_DIR, data_filename)
+    if INCREMENTAL and os.path.exists(existing_path):
+        existing_data = read_producer_data(existing_path)
+        logger.info(f"Incremental run based on {existing_path}")
+
+    if DATA_FORMAT == "ndjson":
+        # Write each producer as it finishes, then read the file back one
+        # producer at a time so the data set is never held in memory
+        data_path = extractor.save_as_ndjson(
+            extractor.iter_producer_data(existing_data), data_filename
+        )
+        # The previous run's data is no longer needed
+        existing_data = None
+
+        def producer_items():
+            return iter_producer_records(data_path)
+
+    else:
+        producer_data = extractor.extract_all_producer_data(existing_data)
+
+        # Save as JSON
+        extractor.save_as_json(producer_data)
+
+        def producer_items():
+            return producer_data.items()
+
+    # Collect the images for the derivatives while building the DataFrames
+    images = []
+
+    def with_images(items):
+        for producer, data in items:
+            if DERIVATIVES_DIR:
+                images.extend(
+                    (s3_key, image.get("etag"))
+                    for s3_key, image in data["tree_images"].items()
+                )
+            yield producer, data
 
     # Create analysis DataFrames
-    dataframes = extractor.create_analysis_dataframes(producer_data)
+    dataframes = extractor.create_analysis_dataframes(with_images(producer_items()))
+
+    # Generate thumbnails and previews for the dashboard if requested
+    if DERIVATIVES_DIR:
+        extractor.create_image_derivatives(images, DERIVATIVES_DIR)
 
     # Example: Save DataFrames as CSV
     for name, df in dataframes.items():
         df.to_csv(f"{OUTPUT_DIR}/{name}.csv", index=False)
         print(f"Saved {name}.csv with {len(df)} rows")
 
-    print(f"Data extraction complete. Found {len(producer_data)} producers.")
-    return producer_data
+    print(
+        "Data extraction complete. "
+        f"Found {len(dataframes['producer_summary'])} producers."
+    )
+    return dataframes
 
 
 if __name__ == "__main__":
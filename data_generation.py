@@ -1,11 +1,27 @@
+import hashlib
 import json
 import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import openai
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 
+from offline_enrichment import OfflineEnricher
+from producer_records import iter_producer_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -14,36 +30,343 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# Get OpenAI API key from environment variables
+# Get OpenAI API key from environment variables; only the openai backend needs it
 openai.api_key = os.getenv("OPENAI_API_KEY")
-if not openai.api_key:
-    logging.error(
-        "OpenAI API key not found. Make sure OPENAI_API_KEY is set in your .env file."
-    )
-    raise ValueError("OpenAI API key is required to run this script")
+
+
+# Supported formats for the dashboard tables
+OUTPUT_FORMATS = ("csv", "parquet")
+
+# Backends generating profiles, yields and insights: the OpenAI API, or the
+# rule-based OfflineEnricher which needs no network access
+ENRICHMENT_BACKENDS = ("openai", "offline")
+
+# Retries for completions rejected with a rate limit error
+COMPLETION_RETRIES = 5
+
+# Completion tokens budgeted per producer profile in a batched request
+PROFILE_TOKENS_PER_PRODUCER = 600
+
+# Largest profile batch whose prompt and completion fit the 8k context of gpt-4
+MAX_PRODUCER_BATCH_SIZE = 8
+
+# Fields every generated producer profile must contain
+PRODUCER_PROFILE_FIELDS = (
+    "name",
+    "village",
+    "age",
+    "join_date",
+    "farm_size_hectares",
+    "num_trees",
+    "phone",
+    "yield_history",
+    "estimated_yield",
+    "tree_health",
+    "soil_quality",
+)
+
+
+def parse_json_block(text, pattern=r"({[\s\S]*})"):
+    """Return the JSON value matched by pattern in a completion, or None."""
+    json_match = re.search(pattern, text or "")
+    if not json_match:
+        return None
+    try:
+        return json.loads(json_match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def is_json_object(text):
+    """Check that a completion contains a JSON object."""
+    return isinstance(parse_json_block(text), dict)
+
+
+def is_json_array(text):
+    """Check that a completion contains a JSON array."""
+    return isinstance(parse_json_block(text, r"(\[[\s\S]*\])"), list)
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window limiting requests and tokens per minute.
+
+    acquire() blocks until the request fits into both budgets, so worker
+    threads are spread out instead of running into 429 responses. A limit of
+    None disables that budget.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()  # (timestamp, tokens) of recent requests
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Wait until a request using the given number of tokens may be sent."""
+        if self.tokens_per_minute:
+            # A single request larger than the budget would never fit
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.WINDOW:
+                    self._tokens -= self._events.popleft()[1]
+
+                fits_requests = (
+                    not self.requests_per_minute
+                    or len(self._events) < self.requests_per_minute
+                )
+                fits_tokens = (
+                    not self.tokens_per_minute
+                    or self._tokens + tokens <= self.tokens_per_minute
+                )
+                if fits_requests and fits_tokens:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = self.WINDOW - (now - self._events[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+class CompletionCache:
+    """
+    Disk cache of OpenAI completions, one JSON file per request.
+
+    Entries are content-addressed: the file name is the SHA-256 of the model,
+    prompts and max_tokens, so an unchanged request is answered from disk and
+    any change to a prompt simply misses. Entries older than ttl_seconds are
+    ignored, and the least recently used entries are removed once the cache
+    grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=30 * 24 * 3600, max_bytes=100 * 2**20):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size
+            for entry in os.scandir(cache_dir)
+            if entry.name.endswith(".json")
+        )
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, max_tokens):
+        """Hash the parts of a request that determine its completion."""
+        payload = json.dumps([model, system_prompt, prompt, max_tokens])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached completion for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            return None
+        try:
+            # Mark the entry as recently used for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["content"]
+
+    def delete(self, key):
+        """Remove the entry for key if there is one."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            self._size -= size
+
+    def set(self, key, content):
+        """Store a completion and evict old entries if the cache is too large."""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"created": time.time(), "content": content}, f)
+        size = os.path.getsize(tmp_path)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until under max_bytes."""
+        entries = sorted(
+            (
+                entry
+                for entry in os.scandir(self.cache_dir)
+                if entry.name.endswith(".json")
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
 
 
 class ProducerDataProcessor:
-    def __init__(self, input_json_path, output_dir="processed_data"):
-        """Initialize the processor with paths for input and output."""
+    def __init__(
+        self,
+        input_json_path,
+        output_dir="processed_data",
+        output_format="csv",
+        max_concurrency=8,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        completion_cache=None,
+        producer_batch_size=5,
+        backend="openai",
+        seed=42,
+    ):
+        """
+        Initialize the processor with paths for input and output.
+
+        Args:
+            input_json_path (str): Producer data as JSON or NDJSON
+            output_dir (str): Directory for the dashboard tables
+            output_format (str): "csv" or "parquet"
+            max_concurrency (int): Maximum number of OpenAI requests in flight
+            requests_per_minute (int): OpenAI request budget, None for no limit
+            tokens_per_minute (int): OpenAI token budget, None for no limit
+            completion_cache (CompletionCache): Cache for OpenAI completions,
+                None to always call the API
+            producer_batch_size (int): Producer profiles requested per OpenAI
+                call, 1 for one call per producer, at most
+                MAX_PRODUCER_BATCH_SIZE
+            backend (str): "openai" or "offline"
+            seed (int): Seed for the offline backend
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        if backend not in ENRICHMENT_BACKENDS:
+            raise ValueError(f"Unsupported enrichment backend: {backend}")
+        if backend == "openai" and not openai.api_key:
+            logging.error(
+                "OpenAI API key not found. Make sure OPENAI_API_KEY is set in your "
+                ".env file, or use the offline backend."
+            )
+            raise ValueError("OpenAI API key is required for the openai backend")
+        if output_format == "parquet" and pq is None:
+            raise ValueError("pyarrow is required to write Parquet output")
+
         self.input_json_path = input_json_path
         self.output_dir = output_dir
+        self.output_format = output_format
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.completion_cache = completion_cache
+        if producer_batch_size > MAX_PRODUCER_BATCH_SIZE:
+            logging.warning(
+                f"Producer batch size {producer_batch_size} would exceed the model "
+                f"context, using {MAX_PRODUCER_BATCH_SIZE}"
+            )
+        self.producer_batch_size = min(
+            max(1, producer_batch_size), MAX_PRODUCER_BATCH_SIZE
+        )
+        self.backend = backend
 
         # Create output directory if it doesn't exist
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Load the producer data from JSON
-        with open(input_json_path, "r") as f:
-            self.producer_data = json.load(f)
+        # Per-producer inputs of the enrichment, filled by
+        # extract_and_process_data while it streams the input file
+        self.producer_inputs = {}
 
-        logging.info(f"Loaded producer data from {input_json_path}")
+        self.offline_enricher = None
+        if backend == "offline":
+            self.offline_enricher = OfflineEnricher(seed)
+
+    def _complete(
+        self, system_prompt, prompt, max_tokens, model="gpt-4", validate=None
+    ):
+        """
+        Run one chat completion and return the message content.
+
+        Completions are served from the completion cache when possible. Other
+        requests wait for the rate limiter first, and requests rejected with a
+        rate limit error are retried with exponential backoff.
+
+        Only completions accepted by validate are cached, so a malformed
+        answer is requested again on the next run instead of being replayed
+        until it expires. Cached entries failing validate are evicted.
+        """
+        if self.completion_cache is not None:
+            cache_key = self.completion_cache.make_key(
+                model, system_prompt, prompt, max_tokens
+            )
+            content = self.completion_cache.get(cache_key)
+            if content is not None:
+                if validate is None or validate(content):
+                    return content
+                self.completion_cache.delete(cache_key)
+
+        # Rough estimate: ~4 characters per token plus the completion budget
+        tokens = (len(system_prompt) + len(prompt)) // 4 + max_tokens
+        rate_limit_error = getattr(openai, "RateLimitError", Exception)
+
+        for attempt in range(COMPLETION_RETRIES):
+            self.rate_limiter.acquire(tokens)
+            try:
+                response = openai.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt},
+                    ],
+                    max_tokens=max_tokens,
+                )
+                content = response.choices[0].message.content
+                if self.completion_cache is not None and (
+                    validate is None or validate(content)
+                ):
+                    self.completion_cache.set(cache_key, content)
+                return content
+            except rate_limit_error:
+                if attempt == COMPLETION_RETRIES - 1:
+                    raise
+                delay = 2**attempt
+                logging.warning(f"OpenAI rate limit hit, retrying in {delay}s")
+                time.sleep(delay)
 
     def extract_and_process_data(self):
-        """Extract data from producer_data.json and process it into DataFrames."""
-        # Extract producer summary data
+        """
+        Extract data from the producer data file and process it into DataFrames.
+
+        The file is streamed one producer at a time. Only the fields needed
+        for the enrichment are kept for each producer, in producer_inputs.
+        """
         producer_summary = []
-        for producer_id, data in self.producer_data.items():
+        images = []
+        messages = []
+        for producer_id, data in iter_producer_records(self.input_json_path):
+            # Producer summary
             producer_summary.append(
                 {
                     "producer_id": producer_id,
@@ -53,12 +376,7 @@ class ProducerDataProcessor:
                 }
             )
 
-        producer_summary_df = pd.DataFrame(producer_summary)
-        logging.info("Created producer summary DataFrame")
-
-        # Extract images data
-        images = []
-        for producer_id, data in self.producer_data.items():
+            # Images
             for image_path, image_data in data.get("tree_images", {}).items():
                 image_info = {
                     "producer_id": producer_id,
@@ -74,12 +392,7 @@ class ProducerDataProcessor:
 
                 images.append(image_info)
 
-        images_df = pd.DataFrame(images)
-        logging.info("Created images DataFrame")
-
-        # Extract messages data
-        messages = []
-        for producer_id, data in self.producer_data.items():
+            # Messages
             for msg in data.get("chat_history", []):
                 msg_data = {
                     "producer_id": producer_id,
@@ -90,6 +403,16 @@ class ProducerDataProcessor:
                 }
                 messages.append(msg_data)
 
+            self._add_producer_inputs(producer_id, data)
+
+        logging.info(f"Loaded producer data from {self.input_json_path}")
+
+        producer_summary_df = pd.DataFrame(producer_summary)
+        logging.info("Created producer summary DataFrame")
+
+        images_df = pd.DataFrame(images)
+        logging.info("Created images DataFrame")
+
         messages_df = pd.DataFrame(messages)
         logging.info("Created messages DataFrame")
 
@@ -99,6 +422,26 @@ class ProducerDataProcessor:
             "messages": messages_df,
         }
 
+    def _add_producer_inputs(self, producer_id, data):
+        """Keep the parts of a producer's data used by the enrichment."""
+        # The user name comes from the metadata of the first image
+        user_name = "Unknown"
+        tree_images = data.get("tree_images")
+        if tree_images:
+            first_image = next(iter(tree_images.values()))
+            user_name = first_image.get("metadata", {}).get("user_name", "Unknown")
+
+        self.producer_inputs[producer_id] = {
+            "total_images": data.get("total_images", 0),
+            "total_chat_messages": data.get("total_chat_messages", 0),
+            # The profile prompts only use the first few messages
+            "chat_history": data.get("chat_history", [])[:3],
+            "user_name": user_name,
+        }
+
+        if self.offline_enricher is not None:
+            self.offline_enricher.add_producer(producer_id, data)
+
     def _get_last_activity_date(self, data):
         """Extract the most recent activity date from a producer's data."""
         dates = []
@@ -160,7 +503,9 @@ class ProducerDataProcessor:
         message_sample = ""
         if not messages_df.empty and "query" in messages_df.columns:
             message_sample = (
-                messages_df["query"].sample(min(5, len(messages_df))).tolist()
+                messages_df["query"]
+                .sample(min(5, len(messages_df)), random_state=0)
+                .tolist()
             )
 
         # Create a prompt for OpenAI
@@ -184,19 +529,12 @@ class ProducerDataProcessor:
         """
 
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4",  # or whatever model you prefer
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an agricultural expert specializing in cocoa farming.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            insights = self._complete(
+                "You are an agricultural expert specializing in cocoa farming.",
+                prompt,
                 max_tokens=1000,
+                validate=bool,
             )
-
-            insights = response.choices[0].message.content
             logging.info("Generated insights using OpenAI API")
             return insights
 
@@ -235,23 +573,14 @@ class ProducerDataProcessor:
         """
 
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a data scientist specializing in agricultural yield forecasting.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            yield_data_str = self._complete(
+                "You are a data scientist specializing in agricultural yield forecasting.",
+                prompt,
                 max_tokens=800,
+                validate=is_json_object,
             )
 
-            yield_data_str = response.choices[0].message.content
-
             # Extract the JSON object from the response
-            import re
-
             json_match = re.search(r"({[\s\S]*})", yield_data_str)
             if json_match:
                 yield_data_json = json_match.group(1)
@@ -346,23 +675,14 @@ class ProducerDataProcessor:
         """
 
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a plant pathologist specializing in cocoa diseases.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            disease_data_str = self._complete(
+                "You are a plant pathologist specializing in cocoa diseases.",
+                prompt,
                 max_tokens=400,
+                validate=is_json_object,
             )
 
-            disease_data_str = response.choices[0].message.content
-
             # Extract the JSON object from the response
-            import re
-
             json_match = re.search(r"({[\s\S]*})", disease_data_str)
             if json_match:
                 disease_data_json = json_match.group(1)
@@ -437,23 +757,14 @@ class ProducerDataProcessor:
         """
 
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a data specialist for an agricultural cooperative.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            producer_data_str = self._complete(
+                "You are a data specialist for an agricultural cooperative.",
+                prompt,
                 max_tokens=800,
+                validate=is_json_object,
             )
 
-            producer_data_str = response.choices[0].message.content
-
             # Extract the JSON object from the response
-            import re
-
             json_match = re.search(r"({[\s\S]*})", producer_data_str)
             if json_match:
                 producer_data_json = json_match.group(1)
@@ -519,113 +830,146 @@ class ProducerDataProcessor:
                 },
             }
 
-    def create_dashboard_csvs(self, dataframes, insights):
-        """Transform the extracted data into the format needed by the dashboard."""
-
-        # Load producer data from JSON
-        with open("producer_data/producer_data.json") as f:
-            producer_data = json.load(f)
+    def generate_producer_details_batch_with_openai(self, producers):
+        """
+        Generate details for several producers in a single OpenAI request.
 
-        producers = []
-        for _, row in dataframes["producer_summary"].iterrows():
-            producer_id = row["producer_id"]
+        The profile instructions are sent once for the whole batch and the
+        model returns a JSON array with one profile per producer ID. Profiles
+        that are missing or fail validation are generated again one producer
+        at a time with generate_producer_details_with_openai.
 
-            # Get original producer data
-            producer_orig_data = self.producer_data.get(producer_id, {})
+        Args:
+            producers (list): (producer_id, producer_data) pairs
 
-            # Generate detailed producer info using OpenAI
-            producer_details = self.generate_producer_details_with_openai(
-                producer_id, producer_orig_data
+        Returns:
+            list: Producer details in the same order as producers
+        """
+        if len(producers) == 1:
+            return [self.generate_producer_details_with_openai(*producers[0])]
+
+        activity = []
+        for producer_id, producer_data in producers:
+            messages = [
+                msg["query"]
+                for msg in producer_data.get("chat_history", [])[:3]
+                if "query" in msg
+            ]
+            activity.append(
+                f"- Producer ID: {producer_id}; "
+                f"images uploaded: {producer_data.get('total_images', 0)}; "
+                f"messages sent: {producer_data.get('total_chat_messages', 0)}; "
+                f"sample messages: {json.dumps(messages, ensure_ascii=False)}"
             )
+        activity = "\n".join(activity)
 
-            # Get the messages for this producer
-            producer_messages = dataframes["messages"][
-                dataframes["messages"]["producer_id"] == producer_id
-            ]
+        prompt = f"""
+        Generate realistic profile data for each of the following cocoa farmers in West Africa, based on their activity:
+        {activity}
+        
+        Return a JSON array with one object per producer. Each object must have the following fields:
+        - producer_id: The producer ID given above
+        - name: A realistic name for a farmer in West Africa
+        - village: A realistic village name in a cocoa growing region
+        - age: A reasonable age (between 30-65)
+        - join_date: When they joined the cooperative (between 2018-2022)
+        - farm_size_hectares: Farm size (between 2-15 hectares)
+        - num_trees: Number of cocoa trees (between 200-1200)
+        - phone: A realistic West African phone number
+        - yield_history: Yield history for 2020, 2021, and 2022 in kg
+        - estimated_yield: Estimated yield for current year
+        - tree_health: Percentage breakdown of tree health (healthy, minor_issues, needs_attention)
+        - soil_quality: Soil quality information (pH, nitrogen, phosphorus, potassium)
+        
+        Make the data realistic and consistent with cocoa farming in West Africa.
+        """
 
-            # Create a producer record with AI-generated data
-            producer = {
-                "id": int(producers.__len__() + 1),  # Sequential ID
-                "producer_id": producer_id,  # Original ID
-                "name": producer_details["name"],
-                "village": producer_details["village"],
-                "age": producer_details["age"],
-                "join_date": producer_details["join_date"],
-                "farm_size_hectares": producer_details["farm_size_hectares"],
-                "num_trees": producer_details["num_trees"],
-                "phone": producer_details["phone"],
-                "farm_images": json.dumps([]),  # Empty list as requested
-                "yield_history": json.dumps(producer_details["yield_history"]),
-                "estimated_yield": producer_details["estimated_yield"],
-                "recent_activities": json.dumps(
-                    [
-                        {
-                            "date": datetime.now().strftime("%Y-%m-%d"),
-                            "activity": "Data imported from producer records",
-                        }
-                    ]
-                ),
-                "tree_health": json.dumps(producer_details["tree_health"]),
-                "soil_quality": json.dumps(producer_details["soil_quality"]),
-                "last_active": row["last_active"]
-                or datetime.now().strftime("%Y-%m-%d"),
-            }
+        details_by_id = {}
+        try:
+            batch_data_str = self._complete(
+                "You are a data specialist for an agricultural cooperative.",
+                prompt,
+                max_tokens=PROFILE_TOKENS_PER_PRODUCER * len(producers),
+                validate=is_json_array,
+            )
 
-            # Extract user_name from producer_data's tree_images metadata
-            if (
-                producer_id in producer_data
-                and "tree_images" in producer_data[producer_id]
-            ):
-                tree_images = producer_data[producer_id]["tree_images"]
-                if tree_images:
-                    # Get the first image entry
-                    first_image_key = next(iter(tree_images))
-                    if (
-                        "metadata" in tree_images[first_image_key]
-                        and "user_name" in tree_images[first_image_key]["metadata"]
-                    ):
-                        producer["user_name"] = tree_images[first_image_key][
-                            "metadata"
-                        ]["user_name"]
-                    else:
-                        producer["user_name"] = "Unknown"
-                else:
-                    producer["user_name"] = "Unknown"
+            batch_details = parse_json_block(batch_data_str, r"(\[[\s\S]*\])")
+            if isinstance(batch_details, list):
+                for details in batch_details:
+                    if self._valid_producer_details(details):
+                        details_by_id[str(details.pop("producer_id"))] = details
             else:
-                producer["user_name"] = "Unknown"
-
-            producers.append(producer)
+                logging.error(
+                    "Batched producer details response contained no JSON array, "
+                    f"requesting {len(producers)} producers separately"
+                )
+        except Exception as e:
+            logging.error(
+                "Error generating batched producer details with OpenAI, "
+                f"requesting {len(producers)} producers separately: {e}"
+            )
 
-        producers_df = pd.DataFrame(producers)
-        producers_df.to_csv(f"{self.output_dir}/producers.csv", index=False)
-        logging.info(f"Saved producers data to {self.output_dir}/producers.csv")
+        results = []
+        for producer_id, producer_data in producers:
+            details = details_by_id.get(str(producer_id))
+            if details is None:
+                logging.warning(
+                    f"No valid batched details for producer {producer_id}, "
+                    "requesting them separately"
+                )
+                details = self.generate_producer_details_with_openai(
+                    producer_id, producer_data
+                )
+            results.append(details)
 
-        # Create training attendance data with OpenAI
+        logging.info(
+            f"Generated details for {len(details_by_id)} of {len(producers)} "
+            "producers in one OpenAI request"
+        )
+        return results
+
+    @staticmethod
+    def _valid_producer_details(details):
+        """Check a generated producer profile has the fields the dashboard uses."""
+        if not isinstance(details, dict) or "producer_id" not in details:
+            return False
+        if any(field not in details for field in PRODUCER_PROFILE_FIELDS):
+            return False
+        if not isinstance(details["tree_health"], dict) or not isinstance(
+            details["soil_quality"], dict
+        ):
+            return False
+        if not isinstance(details["yield_history"], (dict, list)):
+            return False
+        try:
+            int(details["age"])
+            int(details["num_trees"])
+            float(details["farm_size_hectares"])
+            float(details["estimated_yield"])
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def generate_training_attendance_with_openai(self):
+        """Generate training attendance percentages using OpenAI."""
         try:
             training_prompt = "Generate realistic training attendance percentages for 5 different training types offered to cocoa farmers. Return a JSON object where keys are training types and values are attendance percentages (0-100)."
 
-            training_response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a training coordinator for agricultural cooperatives.",
-                    },
-                    {"role": "user", "content": training_prompt},
-                ],
+            training_data_str = self._complete(
+                "You are a training coordinator for agricultural cooperatives.",
+                training_prompt,
                 max_tokens=200,
+                validate=is_json_object,
             )
 
-            training_data_str = training_response.choices[0].message.content
-            import re
-
             json_match = re.search(r"({[\s\S]*})", training_data_str)
             if json_match:
                 training_attendance = json.loads(json_match.group(1))
                 logging.info("Generated training attendance data using OpenAI API")
+                return training_attendance
             else:
                 # Fallback
-                training_attendance = {
+                return {
                     "pest_management": 88,
                     "harvesting_techniques": 72,
                     "fermentation_workshop": 65,
@@ -635,7 +979,7 @@ class ProducerDataProcessor:
         except Exception as e:
             logging.error(f"Error generating training attendance with OpenAI: {e}")
             # Fallback
-            training_attendance = {
+            return {
                 "pest_management": 88,
                 "harvesting_techniques": 72,
                 "fermentation_workshop": 65,
@@ -643,132 +987,38 @@ class ProducerDataProcessor:
                 "quality_control": 79,
             }
 
-        # Create aggregate data with insights from OpenAI
-        aggregate_data = {
-            "monthly_yields": json.dumps(
-                self.generate_monthly_yields_with_openai(dataframes)
-            ),
-            "disease_reports": json.dumps(
-                self.generate_disease_reports_with_openai(dataframes)
-            ),
-            "training_attendance": json.dumps(training_attendance),
-            "ai_insights": insights,
-        }
-
-        aggregate_df = pd.DataFrame([aggregate_data])
-        aggregate_df.to_csv(f"{self.output_dir}/aggregate.csv", index=False)
-        logging.info(f"Saved aggregate data to {self.output_dir}/aggregate.csv")
-
-        # Create chat history data from real messages
-        chat_messages = []
-        for _, row in dataframes["messages"].iterrows():
-            # Use a default date if query_time is empty
-            date_str = row.get("query_time", "")
-            try:
-                date = (
-                    datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                    if date_str
-                    else datetime.now()
-                )
-                date_formatted = date.strftime("%Y-%m-%d")
-            except (ValueError, AttributeError):
-                date_formatted = datetime.now().strftime("%Y-%m-%d")
-
-            # Find the corresponding producer
-            producer_id = row.get("producer_id", "")
-            producer_seq_id = 1  # Default
-            for p in producers:
-                if p["producer_id"] == producer_id:
-                    producer_seq_id = p["id"]
-                    break
-
-            chat_messages.append(
-                {
-                    "producer_id": int(producer_seq_id),
-                    "date": date_formatted,
-                    "from": "farmer",
-                    "message": row.get("query", ""),
-                }
+    def generate_placeholder_chat_with_openai(self):
+        """Generate placeholder chat messages using OpenAI."""
+        try:
+            chat_prompt = """
+            Generate 5 realistic conversation exchanges between a cocoa farmer and an agricultural advisor.
+            Each exchange should include a question from the farmer and a response from the advisor.
+            Focus on common issues in cocoa farming like disease management, harvest timing, etc.
+            
+            Format as a JSON array of objects, each with:
+            - producer_id: 1
+            - date: a date in 2023 (YYYY-MM-DD format)
+            - from: either "farmer" or "advisor"
+            - message: the content of the message
+            
+            Make sure to alternate between farmer and advisor messages.
+            """
+
+            chat_data_str = self._complete(
+                "You are an agricultural messaging system designer.",
+                chat_prompt,
+                max_tokens=800,
+                validate=is_json_array,
             )
 
-            if row.get("response", ""):
-                chat_messages.append(
-                    {
-                        "producer_id": int(producer_seq_id),
-                        "date": date_formatted,
-                        "from": "advisor",
-                        "message": row.get("response", ""),
-                    }
-                )
-
-        if not chat_messages:
-            # Generate some placeholder messages with OpenAI if none exist
-            try:
-                chat_prompt = """
-                Generate 5 realistic conversation exchanges between a cocoa farmer and an agricultural advisor.
-                Each exchange should include a question from the farmer and a response from the advisor.
-                Focus on common issues in cocoa farming like disease management, harvest timing, etc.
-                
-                Format as a JSON array of objects, each with:
-                - producer_id: 1
-                - date: a date in 2023 (YYYY-MM-DD format)
-                - from: either "farmer" or "advisor"
-                - message: the content of the message
-                
-                Make sure to alternate between farmer and advisor messages.
-                """
-
-                chat_response = openai.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an agricultural messaging system designer.",
-                        },
-                        {"role": "user", "content": chat_prompt},
-                    ],
-                    max_tokens=800,
-                )
-
-                chat_data_str = chat_response.choices[0].message.content
-                import re
-
-                json_match = re.search(r"(\[[\s\S]*\])", chat_data_str)
-                if json_match:
-                    chat_messages = json.loads(json_match.group(1))
-                    logging.info("Generated chat messages using OpenAI API")
-                else:
-                    # Fallback
-                    chat_messages = [
-                        {
-                            "producer_id": 1,
-                            "date": "2023-07-01",
-                            "from": "farmer",
-                            "message": "Hello, I have a question about my cocoa trees.",
-                        },
-                        {
-                            "producer_id": 1,
-                            "date": "2023-07-01",
-                            "from": "advisor",
-                            "message": "Hello! What would you like to know?",
-                        },
-                        {
-                            "producer_id": 1,
-                            "date": "2023-07-01",
-                            "from": "farmer",
-                            "message": "Some leaves are turning yellow. What should I do?",
-                        },
-                        {
-                            "producer_id": 1,
-                            "date": "2023-07-01",
-                            "from": "advisor",
-                            "message": "That could be a sign of nutrient deficiency. Try adding some nitrogen-rich fertilizer.",
-                        },
-                    ]
-            except Exception as e:
-                logging.error(f"Error generating chat messages with OpenAI: {e}")
+            json_match = re.search(r"(\[[\s\S]*\])", chat_data_str)
+            if json_match:
+                chat_messages = json.loads(json_match.group(1))
+                logging.info("Generated chat messages using OpenAI API")
+                return chat_messages
+            else:
                 # Fallback
-                chat_messages = [
+                return [
                     {
                         "producer_id": 1,
                         "date": "2023-07-01",
@@ -794,25 +1044,437 @@ class ProducerDataProcessor:
                         "message": "That could be a sign of nutrient deficiency. Try adding some nitrogen-rich fertilizer.",
                     },
                 ]
+        except Exception as e:
+            logging.error(f"Error generating chat messages with OpenAI: {e}")
+            # Fallback
+            return [
+                {
+                    "producer_id": 1,
+                    "date": "2023-07-01",
+                    "from": "farmer",
+                    "message": "Hello, I have a question about my cocoa trees.",
+                },
+                {
+                    "producer_id": 1,
+                    "date": "2023-07-01",
+                    "from": "advisor",
+                    "message": "Hello! What would you like to know?",
+                },
+                {
+                    "producer_id": 1,
+                    "date": "2023-07-01",
+                    "from": "farmer",
+                    "message": "Some leaves are turning yellow. What should I do?",
+                },
+                {
+                    "producer_id": 1,
+                    "date": "2023-07-01",
+                    "from": "advisor",
+                    "message": "That could be a sign of nutrient deficiency. Try adding some nitrogen-rich fertilizer.",
+                },
+            ]
+
+    def generate_insights(self, dataframes):
+        """Generate the dashboard insights with the configured backend."""
+        if self.offline_enricher is not None:
+            return self.offline_enricher.generate_insights(dataframes)
+        return self.generate_insights_with_openai(dataframes)
+
+    def _enrich_with_openai(self, dataframes, producer_items):
+        """
+        Generate profiles and aggregate data with concurrent OpenAI requests.
+
+        Returns:
+            dict: producer_details (in producer order), monthly_yields,
+                disease_reports, training_attendance and placeholder_chat
+                (None unless there are no messages)
+        """
+        # Producer profiles are requested producer_batch_size at a time
+        batches = [
+            producer_items[start : start + self.producer_batch_size]
+            for start in range(0, len(producer_items), self.producer_batch_size)
+        ]
+
+        # Run the OpenAI requests concurrently; the rate limiter in _complete
+        # keeps them within the configured requests and tokens per minute
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            training_future = executor.submit(
+                self.generate_training_attendance_with_openai
+            )
+            yields_future = executor.submit(
+                self.generate_monthly_yields_with_openai, dataframes
+            )
+            disease_future = executor.submit(
+                self.generate_disease_reports_with_openai, dataframes
+            )
+            chat_future = None
+            if dataframes["messages"].empty:
+                chat_future = executor.submit(
+                    self.generate_placeholder_chat_with_openai
+                )
+
+            # map() yields the batches, and each batch its details, in order
+            producer_details = [
+                details
+                for batch_details in executor.map(
+                    self.generate_producer_details_batch_with_openai, batches
+                )
+                for details in batch_details
+            ]
+
+        return {
+            "producer_details": producer_details,
+            "monthly_yields": yields_future.result(),
+            "disease_reports": disease_future.result(),
+            "training_attendance": training_future.result(),
+            "placeholder_chat": chat_future.result() if chat_future else None,
+        }
+
+    def _enrich_offline(self, dataframes, producer_items):
+        """Generate the same data as _enrich_with_openai with the OfflineEnricher."""
+        enricher = self.offline_enricher
+        return {
+            "producer_details": [
+                enricher.generate_producer_details(producer_id, data)
+                for producer_id, data in producer_items
+            ],
+            "monthly_yields": enricher.generate_monthly_yields(dataframes),
+            "disease_reports": enricher.generate_disease_reports(dataframes),
+            "training_attendance": enricher.generate_training_attendance(dataframes),
+            "placeholder_chat": (
+                enricher.generate_placeholder_chat()
+                if dataframes["messages"].empty
+                else None
+            ),
+        }
+
+    def create_dashboard_csvs(self, dataframes, insights):
+        """Transform the extracted data into the format needed by the dashboard."""
+
+        producer_summary = dataframes["producer_summary"]
+
+        # Producer inputs kept by extract_and_process_data
+        producer_items = [
+            (producer_id, self.producer_inputs.get(producer_id, {}))
+            for producer_id in producer_summary["producer_id"]
+        ]
+        if self.offline_enricher is not None:
+            enrichment = self._enrich_offline(dataframes, producer_items)
+        else:
+            enrichment = self._enrich_with_openai(dataframes, producer_items)
+        all_producer_details = enrichment["producer_details"]
+
+        producers = []
+        for (_, row), producer_details in zip(
+            producer_summary.iterrows(), all_producer_details
+        ):
+            producer_id = row["producer_id"]
+
+            # Create a producer record with AI-generated data
+            producer = {
+                "id": int(producers.__len__() + 1),  # Sequential ID
+                "producer_id": producer_id,  # Original ID
+                "name": producer_details["name"],
+                "village": producer_details["village"],
+                "age": producer_details["age"],
+                "join_date": producer_details["join_date"],
+                "farm_size_hectares": producer_details["farm_size_hectares"],
+                "num_trees": producer_details["num_trees"],
+                "phone": producer_details["phone"],
+                "farm_images": json.dumps([]),  # Empty list as requested
+                "yield_history": json.dumps(producer_details["yield_history"]),
+                "estimated_yield": producer_details["estimated_yield"],
+                "recent_activities": json.dumps(
+                    [
+                        {
+                            "date": datetime.now().strftime("%Y-%m-%d"),
+                            "activity": "Data imported from producer records",
+                        }
+                    ]
+                ),
+                "tree_health": json.dumps(producer_details["tree_health"]),
+                "soil_quality": json.dumps(producer_details["soil_quality"]),
+                "last_active": (
+                    datetime.now().strftime("%Y-%m-%d")
+                    if pd.isna(row["last_active"])
+                    else row["last_active"]
+                ),
+            }
+
+            # user_name from the first image's metadata, kept with the inputs
+            inputs = self.producer_inputs.get(producer_id, {})
+            producer["user_name"] = inputs.get("user_name", "Unknown")
+
+            producers.append(producer)
+
+        producers_df = pd.DataFrame(producers)
+        if self.output_format == "parquet":
+            self._save_producers_parquet(producers)
+        else:
+            producers_df.to_csv(f"{self.output_dir}/producers.csv", index=False)
+            logging.info(f"Saved producers data to {self.output_dir}/producers.csv")
+
+        # Create aggregate data with insights from OpenAI
+        aggregate_data = {
+            "monthly_yields": json.dumps(enrichment["monthly_yields"]),
+            "disease_reports": json.dumps(enrichment["disease_reports"]),
+            "training_attendance": json.dumps(enrichment["training_attendance"]),
+            "ai_insights": insights,
+        }
+
+        aggregate_df = pd.DataFrame([aggregate_data])
+        self._save_table(aggregate_df, "aggregate")
+        logging.info(f"Saved aggregate data to {self.output_dir}")
+
+        # Create chat history data from real messages
+        chat_df = self._build_chat_history(dataframes["messages"], producers)
+
+        if chat_df.empty and enrichment["placeholder_chat"] is not None:
+            # Placeholder messages generated since none exist
+            chat_df = pd.DataFrame(enrichment["placeholder_chat"])
+        self._save_table(chat_df, "chat_history")
+        logging.info(f"Saved chat history to {self.output_dir}")
+
+    def _build_chat_history(self, messages_df, producers):
+        """
+        Turn the messages DataFrame into dashboard chat rows.
+
+        Each message becomes a farmer row, followed by an advisor row when it
+        has a response. Producer IDs are mapped to the sequential dashboard IDs
+        through a dict, and dates are normalized column-wise, so the cost is
+        linear in the number of messages.
+
+        Args:
+            messages_df (DataFrame): Messages from extract_and_process_data
+            producers (list): Producer records with "id" and "producer_id"
+
+        Returns:
+            DataFrame: producer_id, date, from and message columns
+        """
+        columns = ["producer_id", "date", "from", "message"]
+        if messages_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        seq_ids = {p["producer_id"]: p["id"] for p in producers}
+        producer_ids = messages_df["producer_id"].map(seq_ids).fillna(1).astype(int)
+
+        # The date is the leading YYYY-MM-DD of the ISO timestamp; missing or
+        # unparseable timestamps default to today
+        dates = (
+            pd.to_datetime(
+                messages_df["query_time"].astype("string").str.slice(0, 10),
+                format="%Y-%m-%d",
+                errors="coerce",
+            )
+            .dt.strftime("%Y-%m-%d")
+            .fillna(datetime.now().strftime("%Y-%m-%d"))
+        )
+
+        farmer = pd.DataFrame(
+            {
+                "producer_id": producer_ids,
+                "date": dates,
+                "from": "farmer",
+                "message": messages_df["query"],
+                "order": range(0, 2 * len(messages_df), 2),
+            }
+        )
+        advisor = pd.DataFrame(
+            {
+                "producer_id": producer_ids,
+                "date": dates,
+                "from": "advisor",
+                "message": messages_df["response"],
+                "order": range(1, 2 * len(messages_df), 2),
+            }
+        )
+        has_response = advisor["message"].notna() & (advisor["message"] != "")
+
+        # Interleave so each response directly follows its question
+        chat_df = pd.concat([farmer, advisor[has_response]], ignore_index=True)
+        chat_df = chat_df.sort_values("order", kind="stable")
+        return chat_df[columns].reset_index(drop=True)
+
+    def _save_table(self, df, name):
+        """Save a flat DataFrame as <name>.csv or <name>.parquet."""
+        if self.output_format == "parquet":
+            pq.write_table(
+                pa.Table.from_pandas(df, preserve_index=False),
+                f"{self.output_dir}/{name}.parquet",
+            )
+        else:
+            df.to_csv(f"{self.output_dir}/{name}.csv", index=False)
+
+    def _save_producers_parquet(self, producers):
+        """
+        Save producers as Parquet with native list and struct columns.
+
+        The OpenAI-generated profiles vary in shape (yield history as a dict or
+        a list, percentages as "80%" strings, "ph" vs "pH"), so the nested
+        fields are normalized to one schema before writing.
+        """
+        schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("producer_id", pa.string()),
+                ("name", pa.string()),
+                ("village", pa.string()),
+                ("age", pa.int64()),
+                ("join_date", pa.string()),
+                ("farm_size_hectares", pa.float64()),
+                ("num_trees", pa.int64()),
+                ("phone", pa.string()),
+                ("farm_images", pa.list_(pa.string())),
+                (
+                    "yield_history",
+                    pa.list_(
+                        pa.struct([("year", pa.int64()), ("yield_kg", pa.float64())])
+                    ),
+                ),
+                ("estimated_yield", pa.int64()),
+                (
+                    "recent_activities",
+                    pa.list_(
+                        pa.struct([("date", pa.string()), ("activity", pa.string())])
+                    ),
+                ),
+                (
+                    "tree_health",
+                    pa.struct(
+                        [
+                            ("healthy", pa.int64()),
+                            ("minor_issues", pa.int64()),
+                            ("needs_attention", pa.int64()),
+                        ]
+                    ),
+                ),
+                (
+                    "soil_quality",
+                    pa.struct(
+                        [
+                            ("pH", pa.float64()),
+                            ("nitrogen", pa.string()),
+                            ("phosphorus", pa.string()),
+                            ("potassium", pa.string()),
+                        ]
+                    ),
+                ),
+                ("last_active", pa.string()),
+                ("user_name", pa.string()),
+            ]
+        )
+
+        def number(value):
+            # OpenAI may answer numbers as strings ("45", "80%"); None when
+            # the value cannot be read as a number
+            if isinstance(value, str):
+                value = value.replace("%", "").replace(",", "").strip()
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None
+            return None if pd.isna(value) else value
+
+        def integer(value):
+            value = number(value)
+            return None if value is None else int(round(value))
+
+        def text(value):
+            # NaN from pandas and numbers from OpenAI both end up in string columns
+            if value is None or (isinstance(value, float) and pd.isna(value)):
+                return None
+            return str(value)
+
+        string_fields = [
+            field.name for field in schema if pa.types.is_string(field.type)
+        ]
+
+        records = []
+        for producer in producers:
+            yield_history = json.loads(producer["yield_history"])
+            if isinstance(yield_history, dict):
+                yield_history = [
+                    {"year": year, "yield_kg": value}
+                    for year, value in yield_history.items()
+                ]
+            yield_history = [
+                {
+                    "year": integer(entry.get("year")),
+                    "yield_kg": number(entry.get("yield_kg")),
+                }
+                for entry in yield_history
+                if isinstance(entry, dict)
+            ]
+            tree_health = json.loads(producer["tree_health"])
+            soil_quality = json.loads(producer["soil_quality"])
+
+            record = dict(producer)
+            for field in string_fields:
+                record[field] = text(producer.get(field))
+            for field in ("age", "num_trees", "estimated_yield"):
+                record[field] = integer(producer.get(field))
+            record["farm_size_hectares"] = number(producer.get("farm_size_hectares"))
+            record["farm_images"] = json.loads(producer["farm_images"])
+            record["yield_history"] = yield_history
+            record["recent_activities"] = json.loads(producer["recent_activities"])
+            record["tree_health"] = {
+                key: integer(tree_health.get(key))
+                for key in ("healthy", "minor_issues", "needs_attention")
+            }
+            record["soil_quality"] = {
+                "pH": number(soil_quality.get("pH", soil_quality.get("ph"))),
+                "nitrogen": text(soil_quality.get("nitrogen")),
+                "phosphorus": text(soil_quality.get("phosphorus")),
+                "potassium": text(soil_quality.get("potassium")),
+            }
+            records.append(record)
 
-        chat_df = pd.DataFrame(chat_messages)
-        chat_df.to_csv(f"{self.output_dir}/chat_history.csv", index=False)
-        logging.info(f"Saved chat history to {self.output_dir}/chat_history.csv")
+        table = pa.Table.from_pylist(records, schema=schema)
+        pq.write_table(table, f"{self.output_dir}/producers.parquet")
+        logging.info(f"Saved producers data to {self.output_dir}/producers.parquet")
 
 
 def main():
     # Set paths
-    input_json_path = "producer_data/producer_data.json"
+    input_json_path = os.getenv(
+        "PRODUCER_DATA_PATH", "producer_data/producer_data.json"
+    )
     output_dir = "processed_data"
+    output_format = os.getenv("OUTPUT_FORMAT", "csv")
+    backend = os.getenv("ENRICHMENT_BACKEND", "openai")
+
+    requests_per_minute = os.getenv("OPENAI_RPM")
+    tokens_per_minute = os.getenv("OPENAI_TPM")
+
+    # Reuse completions from earlier runs; set OPENAI_CACHE_DIR="" to disable
+    cache_dir = os.getenv("OPENAI_CACHE_DIR", ".openai_cache")
+    completion_cache = None
+    if cache_dir and backend == "openai":
+        completion_cache = CompletionCache(
+            cache_dir,
+            ttl_seconds=float(os.getenv("OPENAI_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+            max_bytes=int(float(os.getenv("OPENAI_CACHE_MAX_MB", "100")) * 2**20),
+        )
 
     # Process the data
-    processor = ProducerDataProcessor(input_json_path, output_dir)
+    processor = ProducerDataProcessor(
+        input_json_path,
+        output_dir,
+        output_format,
+        max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+        requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+        tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+        completion_cache=completion_cache,
+        producer_batch_size=int(os.getenv("OPENAI_PRODUCER_BATCH_SIZE", "5")),
+        backend=backend,
+        seed=int(os.getenv("ENRICHMENT_SEED", "42")),
+    )
 
     # Extract and process data
     dataframes = processor.extract_and_process_data()
 
-    # Generate insights with OpenAI
-    insights = processor.generate_insights_with_openai(dataframes)
+    # Generate insights with OpenAI or the offline backend
+    insights = processor.generate_insights(dataframes)
 
     # Create dashboard CSVs with AI-generated data
     processor.create_dashboard_csvs(dataframes, insights)
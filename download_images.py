@@ -1,21 +1,160 @@
 import os
 import csv
+import json
+import hashlib
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+# Name of the progress journal kept next to the downloaded images
+JOURNAL_FILENAME = ".download_journal.jsonl"
 
-def download_images_from_csv():
+
+def create_session(max_workers, retries, backoff_factor):
+    """
+    Create a requests session shared by all download threads.
+
+    The connection pool is sized for max_workers, and failed connections and
+    5xx/429 responses are retried with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_journal(journal_path):
+    """
+    Load the entries of completed downloads from a previous run.
+
+    Returns:
+        dict: Maps filenames to their journal entry (url, size, sha256)
+    """
+    entries = {}
+    if not journal_path.exists():
+        return entries
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            entries[entry["filename"]] = entry
+    return entries
+
+
+def is_already_downloaded(image_path, url, journal_entry, checksum):
+    """
+    Check whether an image on disk is complete and can be skipped.
+
+    A file matches if its SHA-256 equals the checksum from the CSV, or, when
+    the CSV has no checksum, if the journal recorded a finished download of
+    the same URL with the same size.
+    """
+    if not image_path.exists():
+        return False
+    if checksum:
+        return file_sha256(image_path) == checksum.lower()
+    return (
+        journal_entry is not None
+        and journal_entry["url"] == url
+        and journal_entry["size"] == image_path.stat().st_size
+    )
+
+
+def download_image(session, image_url, image_path, checksum="", timeout=30):
+    """
+    Download one image to image_path via a temporary .part file.
+
+    The file only gets its final name once it is complete and, when a
+    checksum is given, matches it. Otherwise the .part file is removed.
+
+    Returns:
+        tuple: (size in bytes, hex SHA-256) of the downloaded file
+
+    Raises:
+        requests.RequestException: If the request fails or does not return 200
+        ValueError: If the SHA-256 of the download does not match checksum
+    """
+    tmp_path = image_path.with_name(image_path.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with session.get(image_url, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                raise requests.HTTPError(f"Status code: {response.status_code}")
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+
+        if checksum and digest.hexdigest() != checksum.lower():
+            raise ValueError("Checksum mismatch")
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    # Only complete and verified files ever get the final name
+    os.replace(tmp_path, image_path)
+    return size, digest.hexdigest()
+
+
+def download_images_from_csv(
+    csv_path="dashboard_suppliers/static/data/images.csv",
+    img_dir="dashboard_suppliers/static/img",
+    max_workers=8,
+    retries=3,
+    backoff_factor=0.5,
+):
     """
     Download all images listed in images.csv and save them to static/img directory
+
+    Downloads run concurrently over a pooled session. Every finished download
+    is appended to a journal in img_dir, so an interrupted run can be started
+    again and only fetches the images that are missing or incomplete.
+
+    Args:
+        csv_path (str): CSV with a url/image_url column and optionally a
+            filename and a sha256/checksum column
+        img_dir (str): Directory to save the images to
+        max_workers (int): Number of concurrent downloads
+        retries (int): Retries per image for connection errors and 5xx/429
+        backoff_factor (float): Base delay for exponential backoff in seconds
     """
     print("Starting image download process...")
 
     # Ensure the static/img directory exists
-    img_dir = Path("dashboard_suppliers/static/img")
+    img_dir = Path(img_dir)
     img_dir.mkdir(parents=True, exist_ok=True)
 
     # Path to the CSV file
-    csv_path = Path("dashboard_suppliers/static/data/images.csv")
+    csv_path = Path(csv_path)
 
     if not csv_path.exists():
         print(f"Error: CSV file not found at {csv_path}")
@@ -27,6 +166,13 @@ def download_images_from_csv():
     skipped = 0
     failed = 0
 
+    journal_path = img_dir / JOURNAL_FILENAME
+    journal = load_journal(journal_path)
+    journal_lock = threading.Lock()
+
+    tasks = []
+    # Maps the path of every image in the CSV to the URL it is downloaded from
+    queued_urls = {}
     try:
         with open(csv_path, "r", encoding="utf-8") as csvfile:
             csv_reader = csv.DictReader(csvfile)
@@ -49,6 +195,10 @@ def download_images_from_csv():
                 ),
                 None,
             )
+            checksum_col = next(
+                (col for col in csv_reader.fieldnames if col in ["sha256", "checksum"]),
+                None,
+            )
 
             # Process each row
             for row in csv_reader:
@@ -71,34 +221,68 @@ def download_images_from_csv():
                     if "." not in filename:
                         filename += ".jpg"
 
+                checksum = row[checksum_col].strip() if checksum_col else ""
+
                 # Full path where image will be saved
                 image_path = img_dir / filename
 
-                # Download the image
-                try:
-                    print(f"Downloading: {image_url} -> {image_path}")
-                    response = requests.get(image_url, stream=True, timeout=30)
-
-                    if response.status_code == 200:
-                        with open(image_path, "wb") as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                f.write(chunk)
-                        downloaded += 1
-                        print(f"✓ Downloaded: {filename}")
+                # Rows sharing a filename would download into the same file
+                if image_path in queued_urls:
+                    if queued_urls[image_path] == image_url:
+                        print(f"Duplicate row for {filename}, skipping")
+                        skipped += 1
                     else:
                         print(
-                            f"✗ Failed to download: {filename}. Status code: {response.status_code}"
+                            f"✗ {filename} is also the filename of "
+                            f"{queued_urls[image_path]}, not downloading {image_url}"
                         )
                         failed += 1
+                    continue
+                queued_urls[image_path] = image_url
+
+                if is_already_downloaded(
+                    image_path, image_url, journal.get(filename), checksum
+                ):
+                    print(f"Already downloaded: {filename}, skipping")
+                    skipped += 1
+                    continue
 
-                except Exception as e:
-                    print(f"✗ Error downloading {filename}: {str(e)}")
-                    failed += 1
+                tasks.append((image_url, filename, image_path, checksum))
 
     except Exception as e:
         print(f"Error processing CSV file: {str(e)}")
         return
 
+    session = create_session(max_workers, retries, backoff_factor)
+
+    def download(task):
+        image_url, filename, image_path, checksum = task
+        try:
+            print(f"Downloading: {image_url} -> {image_path}")
+            size, sha256 = download_image(session, image_url, image_path, checksum)
+            entry = {
+                "filename": filename,
+                "url": image_url,
+                "size": size,
+                "sha256": sha256,
+            }
+            with journal_lock:
+                with open(journal_path, "a", encoding="utf-8") as journal_file:
+                    journal_file.write(json.dumps(entry) + "\n")
+            print(f"✓ Downloaded: {filename}")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error downloading {filename}: {str(e)}")
+            return False
+
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for success in executor.map(download, tasks):
+            if success:
+                downloaded += 1
+            else:
+                failed += 1
+
     # Print summary
     print("\nDownload Summary:")
     print(f"Total images in CSV: {total_images}")
@@ -109,4 +293,7 @@ def download_images_from_csv():
 
 
 if __name__ == "__main__":
-    download_images_from_csv()
+    download_images_from_csv(
+        max_workers=int(os.environ.get("DOWNLOAD_MAX_WORKERS", "8")),
+        retries=int(os.environ.get("DOWNLOAD_RETRIES", "3")),
+    )
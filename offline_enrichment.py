@@ -0,0 +1,458 @@
+import random
+import re
+from datetime import datetime
+
+# Keywords (English and French) counted as reports of each disease
+DISEASE_KEYWORDS = {
+    "black_pod": ("black pod", "pourriture brune", "phytophthora", "cabosse noire"),
+    "swollen_shoot": ("swollen shoot", "swollen-shoot", "cssvd"),
+    "capsid_damage": ("capsid", "capside", "mirid", "miride"),
+    "stem_borer": ("stem borer", "borer", "foreur", "eudocima"),
+}
+
+# Generic disease words, counted as "other" when no specific disease matches
+OTHER_DISEASE_KEYWORDS = (
+    "disease",
+    "maladie",
+    "malade",
+    "fungus",
+    "champignon",
+    "yellow",
+    "jaune",
+    "wilt",
+    "fletri",
+    "flétri",
+)
+
+# Share of reports per disease typical for West African farms, used when the
+# activity mentions no disease at all
+DISEASE_PREVALENCE = {
+    "black_pod": 0.31,
+    "swollen_shoot": 0.18,
+    "capsid_damage": 0.25,
+    "stem_borer": 0.14,
+    "other": 0.12,
+}
+
+# Keywords of farmer questions related to each training
+TRAINING_KEYWORDS = {
+    "pest_management": ("pest", "insect", "ravageur", "traitement", "capside"),
+    "harvesting_techniques": ("harvest", "récolte", "recolte", "cabosse", "pod"),
+    "fermentation_workshop": ("ferment", "drying", "séchage", "sechage"),
+    "sustainable_practices": ("shade", "ombrage", "compost", "engrais", "fertili"),
+    "quality_control": ("quality", "qualité", "qualite", "grade", "humidité"),
+}
+
+MONTHS = [
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+]
+
+# Relative harvest per month: main crop Oct-Mar, light mid crop May-Aug
+SEASONAL_WEIGHTS = [
+    0.85,
+    0.72,
+    0.64,
+    0.59,
+    0.48,
+    0.42,
+    0.38,
+    0.45,
+    0.72,
+    0.98,
+    1.05,
+    0.92,
+]
+
+# Years shown by the dashboard; the last one is the current season
+YIELD_CURVE_YEARS = (2021, 2022, 2023)
+YIELD_HISTORY_YEARS = (2020, 2021, 2022)
+
+FIRST_NAMES = [
+    "Kouadio",
+    "Amara",
+    "Yao",
+    "Aya",
+    "Koffi",
+    "Adjoua",
+    "Kouassi",
+    "Affoué",
+    "Moussa",
+    "Awa",
+    "Konan",
+    "Akissi",
+    "Séka",
+    "Mariam",
+    "N'Guessan",
+    "Fatou",
+]
+LAST_NAMES = [
+    "Konan",
+    "Bamba",
+    "Kouamé",
+    "Traoré",
+    "Yao",
+    "Koné",
+    "Ouattara",
+    "Kouassi",
+    "Coulibaly",
+    "N'Dri",
+    "Diabaté",
+    "Touré",
+]
+VILLAGES = [
+    "Abengourou",
+    "Divo",
+    "Soubré",
+    "Daloa",
+    "Gagnoa",
+    "Aboisso",
+    "Méagui",
+    "Duékoué",
+    "San-Pédro",
+    "Agboville",
+]
+NUTRIENT_LEVELS = ["Low", "Medium", "High"]
+
+PLACEHOLDER_CHAT = [
+    {
+        "producer_id": 1,
+        "date": "2023-07-01",
+        "from": "farmer",
+        "message": "Hello, I have a question about my cocoa trees.",
+    },
+    {
+        "producer_id": 1,
+        "date": "2023-07-01",
+        "from": "advisor",
+        "message": "Hello! What would you like to know?",
+    },
+    {
+        "producer_id": 1,
+        "date": "2023-07-01",
+        "from": "farmer",
+        "message": "Some leaves are turning yellow. What should I do?",
+    },
+    {
+        "producer_id": 1,
+        "date": "2023-07-01",
+        "from": "advisor",
+        "message": "That could be a sign of nutrient deficiency. "
+        "Try adding some nitrogen-rich fertilizer.",
+    },
+]
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def _keyword_pattern(keywords):
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+DISEASE_PATTERNS = {
+    disease: _keyword_pattern(keywords)
+    for disease, keywords in DISEASE_KEYWORDS.items()
+}
+OTHER_DISEASE_PATTERN = _keyword_pattern(OTHER_DISEASE_KEYWORDS)
+TRAINING_PATTERNS = {
+    training: _keyword_pattern(keywords)
+    for training, keywords in TRAINING_KEYWORDS.items()
+}
+
+
+class OfflineEnricher:
+    """
+    Rule-based replacement for the OpenAI enrichment in data_generation.
+
+    Profiles, yields, tree health and disease counts are derived from each
+    producer's image and message activity. The remaining randomness comes
+    from a random.Random seeded with the run seed and the producer ID, so the
+    output only depends on the input data and the seed, and producers can be
+    enriched in any order.
+    """
+
+    def __init__(self, seed=42):
+        """
+        Args:
+            seed (int): Seed for all generated values
+        """
+        self.seed = seed
+        self._activity = {}
+        self._details = {}
+
+    def _rng(self, *parts):
+        return random.Random(":".join(str(part) for part in (self.seed, *parts)))
+
+    def add_producer(self, producer_id, producer_data):
+        """
+        Register a producer's activity, read from its full data.
+
+        Producers are added one at a time while the input is streamed, so the
+        full data of all producers is never needed at once.
+        """
+        self._producer_activity(producer_id, producer_data)
+
+    def _producer_activity(self, producer_id, producer_data=None):
+        """Count images, messages and disease and training mentions of a producer."""
+        activity = self._activity.get(producer_id)
+        if activity is not None:
+            return activity
+        if producer_data is None:
+            producer_data = {}
+
+        texts = [
+            str(msg.get("query", "")).lower()
+            for msg in producer_data.get("chat_history", [])
+        ]
+        for image_data in producer_data.get("tree_images", {}).values():
+            metadata = image_data.get("metadata", {})
+            texts.extend(
+                str(value).lower()
+                for key, value in metadata.items()
+                if any(
+                    term in key for term in ("disease", "health", "condition", "leaf")
+                )
+            )
+
+        diseases = dict.fromkeys(DISEASE_PREVALENCE, 0)
+        trainings = dict.fromkeys(TRAINING_KEYWORDS, False)
+        for text in texts:
+            matched = False
+            for disease, pattern in DISEASE_PATTERNS.items():
+                if pattern.search(text):
+                    diseases[disease] += 1
+                    matched = True
+            if not matched and OTHER_DISEASE_PATTERN.search(text):
+                diseases["other"] += 1
+            for training, pattern in TRAINING_PATTERNS.items():
+                if not trainings[training] and pattern.search(text):
+                    trainings[training] = True
+
+        activity = {
+            "images": producer_data.get(
+                "total_images", len(producer_data.get("tree_images", {}))
+            ),
+            "messages": producer_data.get(
+                "total_chat_messages", len(producer_data.get("chat_history", []))
+            ),
+            "diseases": diseases,
+            "trainings": trainings,
+        }
+        self._activity[producer_id] = activity
+        return activity
+
+    def generate_producer_details(self, producer_id, producer_data=None):
+        """Derive a producer profile in the format of the OpenAI profiles."""
+        details = self._details.get(producer_id)
+        if details is not None:
+            return details
+
+        rng = self._rng("producer", producer_id)
+        activity = self._producer_activity(producer_id, producer_data)
+        images = activity["images"]
+        messages = activity["messages"]
+        disease_mentions = sum(activity["diseases"].values())
+
+        # Farmers photographing more trees tend to have larger farms
+        num_trees = int(_clamp(200 + images * 25 + rng.randint(0, 150), 200, 1200))
+        farm_size = round(_clamp(num_trees / rng.uniform(70, 110), 2, 15), 1)
+
+        # Share of activity that reports problems drives the tree health
+        issue_rate = disease_mentions / max(messages + images, 1)
+        needs_attention = int(
+            _clamp(round(4 + 40 * issue_rate + rng.gauss(0, 2)), 0, 40)
+        )
+        minor_issues = int(_clamp(round(12 + 30 * issue_rate + rng.gauss(0, 3)), 0, 45))
+        healthy = 100 - needs_attention - minor_issues
+
+        # Engaged farmers improve faster; yields fall with the share of sick trees
+        kg_per_tree = rng.uniform(0.8, 1.2) * (0.5 + healthy / 200)
+        growth = 0.02 + min(messages, 50) / 1000
+        base = num_trees * kg_per_tree
+        yield_history = {
+            str(year): int(round(base * (1 + growth) ** i * rng.uniform(0.95, 1.05)))
+            for i, year in enumerate(YIELD_HISTORY_YEARS)
+        }
+        estimated_yield = int(
+            round(yield_history[str(YIELD_HISTORY_YEARS[-1])] * (1 + growth))
+        )
+
+        details = {
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "village": rng.choice(VILLAGES),
+            "age": rng.randint(30, 65),
+            "join_date": f"{rng.randint(2018, 2022)}-"
+            f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "farm_size_hectares": farm_size,
+            "num_trees": num_trees,
+            "phone": f"+225 07{rng.randint(0, 99999999):08d}",
+            "yield_history": yield_history,
+            "estimated_yield": estimated_yield,
+            "tree_health": {
+                "healthy": healthy,
+                "minor_issues": minor_issues,
+                "needs_attention": needs_attention,
+            },
+            "soil_quality": {
+                "pH": round(rng.uniform(5.5, 7.0), 1),
+                "nitrogen": rng.choice(NUTRIENT_LEVELS),
+                "phosphorus": rng.choice(NUTRIENT_LEVELS),
+                "potassium": rng.choice(NUTRIENT_LEVELS),
+            },
+        }
+        self._details[producer_id] = details
+        return details
+
+    def _all_producer_details(self, dataframes):
+        return [
+            self.generate_producer_details(producer_id)
+            for producer_id in dataframes["producer_summary"]["producer_id"]
+        ]
+
+    def _total_diseases(self, dataframes):
+        totals = dict.fromkeys(DISEASE_PREVALENCE, 0)
+        for producer_id in dataframes["producer_summary"]["producer_id"]:
+            activity = self._producer_activity(producer_id)
+            for disease, count in activity["diseases"].items():
+                totals[disease] += count
+        return totals
+
+    def generate_disease_reports(self, dataframes):
+        """Count disease reports in messages and image metadata."""
+        reports = self._total_diseases(dataframes)
+        if sum(reports.values()):
+            return reports
+
+        # Nothing reported: spread a number of reports proportional to the
+        # photo activity over the typical prevalence
+        rng = self._rng("diseases")
+        total_images = int(dataframes["producer_summary"]["total_images"].sum())
+        total = int(_clamp(total_images * 0.1, 80, 120)) + rng.randint(-5, 5)
+        return {
+            disease: int(round(total * share * rng.uniform(0.85, 1.15)))
+            for disease, share in DISEASE_PREVALENCE.items()
+        }
+
+    def generate_monthly_yields(self, dataframes):
+        """Spread the producers' yearly yields over a seasonal monthly curve."""
+        rng = self._rng("monthly_yields")
+        all_details = self._all_producer_details(dataframes)
+
+        # The current season runs up to the month of the latest activity
+        last_active = dataframes["producer_summary"]["last_active"].dropna()
+        current_month = 6
+        if not last_active.empty:
+            current_month = datetime.strptime(max(last_active), "%Y-%m-%d").month
+
+        monthly_yields = {"months": MONTHS}
+        weight_sum = sum(SEASONAL_WEIGHTS)
+        for year in YIELD_CURVE_YEARS:
+            year_total = sum(
+                details["yield_history"].get(str(year), details["estimated_yield"])
+                for details in all_details
+            )
+            values = []
+            for month, weight in enumerate(SEASONAL_WEIGHTS, start=1):
+                if year == YIELD_CURVE_YEARS[-1] and month > current_month:
+                    values.append(0)
+                else:
+                    share = weight / weight_sum * rng.uniform(0.92, 1.08)
+                    values.append(int(round(year_total * share)))
+            monthly_yields[str(year)] = values
+        return monthly_yields
+
+    def generate_training_attendance(self, dataframes):
+        """Estimate attendance from the share of producers asking about each topic."""
+        rng = self._rng("training")
+        producer_ids = dataframes["producer_summary"]["producer_id"]
+        interested = dict.fromkeys(TRAINING_KEYWORDS, 0)
+        for producer_id in producer_ids:
+            activity = self._producer_activity(producer_id)
+            for training, asked in activity["trainings"].items():
+                interested[training] += asked
+
+        num_producers = max(len(producer_ids), 1)
+        return {
+            training: int(
+                _clamp(
+                    round(60 + 35 * count / num_producers + rng.uniform(-5, 5)), 0, 100
+                )
+            )
+            for training, count in interested.items()
+        }
+
+    def generate_insights(self, dataframes):
+        """Summarize activity, health and yield potential as plain text."""
+        producer_summary = dataframes["producer_summary"]
+        all_details = self._all_producer_details(dataframes)
+        reports = self._total_diseases(dataframes)
+
+        num_producers = len(producer_summary)
+        total_images = int(producer_summary["total_images"].sum())
+        total_messages = int(producer_summary["total_messages"].sum())
+        active = int((producer_summary["total_messages"] > 0).sum())
+        healthy = sum(
+            details["tree_health"]["healthy"] for details in all_details
+        ) / max(len(all_details), 1)
+        estimated = sum(details["estimated_yield"] for details in all_details)
+
+        lines = [
+            "1. Current state of the farms",
+            f"{num_producers} producers uploaded {total_images} tree images and sent "
+            f"{total_messages} messages; {active} of them asked the advisors at "
+            f"least one question. On average {healthy:.0f}% of trees are healthy.",
+            "",
+            "2. Key health issues",
+        ]
+        reported = sorted(
+            ((count, disease) for disease, count in reports.items() if count),
+            reverse=True,
+        )
+        if reported:
+            lines.extend(
+                f"- {disease.replace('_', ' ')}: {count} reports"
+                for count, disease in reported
+            )
+        else:
+            lines.append("- No disease reports found in messages or image metadata.")
+
+        lines.extend(["", "3. Recommendations"])
+        if reports["black_pod"]:
+            lines.append(
+                "- Remove infected pods and improve drainage against black pod."
+            )
+        if reports["swollen_shoot"]:
+            lines.append("- Cut out and replant trees infected by swollen shoot.")
+        if reports["capsid_damage"]:
+            lines.append("- Schedule capsid treatments before the main crop.")
+        if active < num_producers:
+            lines.append(
+                f"- Reach out to the {num_producers - active} producers without "
+                "messages to share good practices."
+            )
+        lines.append("- Keep pruning and shade management regular across farms.")
+
+        lines.extend(
+            [
+                "",
+                "4. Yield potential",
+                f"Estimated yield for the current season: {estimated:,} kg.",
+            ]
+        )
+        return "\n".join(lines)
+
+    def generate_placeholder_chat(self):
+        """Return a short example conversation for datasets without messages."""
+        return [dict(message) for message in PLACEHOLDER_CHAT]
@@ -0,0 +1,36 @@
+import json
+
+# Reader for the producer data files written by data_extraction. It has no
+# import-time side effects, so data_generation can use it without pulling in
+# the S3 client setup of data_extraction.
+
+
+def iter_producer_records(file_path):
+    """
+    Stream producer data saved by save_as_json or save_as_ndjson.
+
+    NDJSON files (.ndjson/.jsonl, one producer per line) are read line by
+    line, so only one producer is in memory at a time. A JSON file is loaded
+    in one go.
+
+    Yields:
+        tuple: (producer name, producer data)
+    """
+    with open(file_path, "r") as f:
+        if file_path.endswith((".ndjson", ".jsonl")):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["producer_id"], record
+        else:
+            yield from json.load(f).items()
+
+
+def read_producer_data(file_path):
+    """
+    Read producer data saved by save_as_json or save_as_ndjson.
+
+    Returns:
+        dict: Dictionary mapping producer names to their data
+    """
+    return dict(iter_producer_records(file_path))
@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import threading
+
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from moto import mock_aws
+from PIL import Image, features
+
+from data_extraction import S3DataExtractor
+
+BUCKET_NAME = "test-producers"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET_NAME)
+        for producer in ("p1", "p2"):
+            put_chat(client, f"{producer}/chat_history/a.json", "q1", "1")
+            client.put_object(
+                Bucket=BUCKET_NAME,
+                Key=f"{producer}/img0.jpg",
+                Body=b"jpeg",
+                Metadata={"farmer": f"user-{producer}"},
+            )
+        yield client
+
+
+def put_chat(client, key, query, timestamp):
+    client.put_object(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Body=json.dumps([{"query": query, "timestamp": timestamp}]),
+    )
+
+
+def make_extractor(tmp_path):
+    return S3DataExtractor(
+        BUCKET_NAME,
+        local_output_dir=str(tmp_path),
+        max_workers=2,
+        max_object_workers=2,
+    )
+
+
+def queries(producer_data):
+    return [msg["query"] for msg in producer_data["chat_history"]]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_concurrent_extraction_matches_serial(s3_client, tmp_path, max_workers):
+    extractor = S3DataExtractor(
+        BUCKET_NAME,
+        local_output_dir=str(tmp_path),
+        max_workers=max_workers,
+        max_object_workers=max_workers,
+    )
+
+    data = extractor.extract_all_producer_data()
+
+    assert sorted(data) == ["p1", "p2"]
+    assert queries(data["p2"]) == ["q1"]
+    assert data["p2"]["tree_images"]["p2/img0.jpg"]["metadata"] == {"farmer": "user-p2"}
+
+
+def test_producers_are_yielded_as_they_finish(s3_client, tmp_path, monkeypatch):
+    extractor = make_extractor(tmp_path)
+    extract = extractor._extract_producer
+    p2_yielded = threading.Event()
+
+    def slow_first_producer(producer):
+        if producer == "p1":
+            p2_yielded.wait(timeout=5)
+        return extract(producer)
+
+    monkeypatch.setattr(extractor, "_extract_producer", slow_first_producer)
+    order = []
+    for producer, _ in extractor.iter_producer_data():
+        order.append(producer)
+        p2_yielded.set()
+
+    assert order == ["p2", "p1"]
+
+
+def test_failed_chat_fetch_is_retried_on_next_run(s3_client, tmp_path, monkeypatch):
+    previous = make_extractor(tmp_path).extract_all_producer_data({})
+    put_chat(s3_client, "p2/chat_history/c.json", "q2", "2")
+
+    extractor = make_extractor(tmp_path)
+    get_object = extractor.s3_client.get_object
+
+    def flaky_get_object(**kwargs):
+        if kwargs["Key"] == "p2/chat_history/c.json":
+            raise EndpointConnectionError(endpoint_url="https://s3.test")
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(extractor.s3_client, "get_object", flaky_get_object)
+    data = extractor.extract_all_producer_data(previous)
+
+    # The failed producer keeps its previous data and is not in the manifest
+    assert data["p2"] == previous["p2"]
+    assert "p2/chat_history/c.json" not in extractor._load_manifest()
+
+    data = make_extractor(tmp_path).extract_all_producer_data(data)
+    assert queries(data["p2"]) == ["q1", "q2"]
+
+
+def test_failed_listing_keeps_previous_producer_data(s3_client, tmp_path, monkeypatch):
+    previous = make_extractor(tmp_path).extract_all_producer_data({})
+    manifest = make_extractor(tmp_path)._load_manifest()
+
+    extractor = make_extractor(tmp_path)
+    list_objects = extractor._list_objects
+
+    def failing_list_objects(prefix):
+        if prefix == "p1/":
+            raise EndpointConnectionError(endpoint_url="https://s3.test")
+        return list_objects(prefix)
+
+    monkeypatch.setattr(extractor, "_list_objects", failing_list_objects)
+    data = extractor.extract_all_producer_data(previous)
+
+    assert sorted(data) == ["p1", "p2"]
+    assert data["p1"] == previous["p1"]
+    assert extractor._load_manifest() == manifest
+
+
+@pytest.mark.parametrize("webp", [True, False])
+def test_derivative_extension_matches_saved_format(
+    s3_client, tmp_path, monkeypatch, webp
+):
+    image = io.BytesIO()
+    Image.new("RGB", (64, 48), "green").save(image, "JPEG")
+    s3_client.put_object(Bucket=BUCKET_NAME, Key="p1/photo.jpg", Body=image.getvalue())
+    check = features.check
+    monkeypatch.setattr(
+        features,
+        "check",
+        lambda feature: (webp or feature != "webp") and check(feature),
+    )
+
+    derivatives = make_extractor(tmp_path).create_image_derivatives(
+        [("p1/photo.jpg", None), ("p1/missing.jpg", None)],
+        str(tmp_path / "derivatives"),
+        max_processes=1,
+    )
+
+    assert list(derivatives) == ["p1/photo.jpg"]
+    extensions = {"JPEG": ".jpg", "WEBP": ".webp"}
+    for path in derivatives["p1/photo.jpg"].values():
+        with Image.open(path) as derivative:
+            assert extensions[derivative.format] == os.path.splitext(path)[1]
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_metadata_cache_drops_deleted_images(s3_client, tmp_path, incremental):
+    previous = make_extractor(tmp_path).extract_all_producer_data()
+    s3_client.delete_object(Bucket=BUCKET_NAME, Key="p2/img0.jpg")
+
+    extractor = make_extractor(tmp_path)
+    extractor.extract_all_producer_data(previous if incremental else None)
+
+    with open(extractor.metadata_cache_path) as f:
+        assert sorted(json.load(f)) == ["p1/img0.jpg"]
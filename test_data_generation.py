@@ -0,0 +1,205 @@
+import json
+import re
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pandas as pd
+import pytest
+
+import data_generation
+from data_generation import ProducerDataProcessor
+
+PRODUCER_IDS = [str(1700000000 + i) for i in range(7)]
+
+BATCH_PROMPT = "Return a JSON array"
+
+
+def profile(producer_id):
+    return {
+        "producer_id": producer_id,
+        "name": f"Farmer {producer_id}",
+        "village": "Daloa",
+        "age": 45,
+        "join_date": "2020-01-01",
+        "farm_size_hectares": 4.5,
+        "num_trees": 500,
+        "phone": "+225 0700000000",
+        "yield_history": {"2020": 1000, "2021": 1100, "2022": 1200},
+        "estimated_yield": 1300,
+        "tree_health": {"healthy": 80, "minor_issues": 15, "needs_attention": 5},
+        "soil_quality": {
+            "pH": 6.2,
+            "nitrogen": "Medium",
+            "phosphorus": "Low",
+            "potassium": "High",
+        },
+    }
+
+
+def single_profile(producer_id):
+    details = profile(producer_id)
+    del details["producer_id"]
+    details["name"] = f"Single {producer_id}"
+    return json.dumps(details)
+
+
+@pytest.fixture
+def completion_server(monkeypatch):
+    """
+    Local stand-in for the OpenAI chat completions endpoint.
+
+    Requests are answered by server.respond(prompt), which returns the
+    message content, or a (status, error message) tuple for an error response.
+    """
+    server = types.SimpleNamespace(prompts=[], respond=None)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            server.prompts.append(prompt)
+            answer = server.respond(prompt)
+
+            if isinstance(answer, tuple):
+                status, message = answer
+                payload = {"error": {"message": message, "type": "rate_limit_error"}}
+            else:
+                status = 200
+                payload = {
+                    "id": "chatcmpl-test",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    monkeypatch.setattr(openai, "base_url", f"http://127.0.0.1:{httpd.server_port}/v1")
+    # Retries are left to ProducerDataProcessor._complete
+    monkeypatch.setattr(openai, "max_retries", 0)
+    monkeypatch.setattr(openai, "_client", None)
+
+    yield server
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def processor(tmp_path):
+    records = [
+        {
+            "producer_id": producer_id,
+            "total_images": 1,
+            "total_chat_messages": 1,
+            "tree_images": {},
+            "chat_history": [
+                {"query_time": "2025-01-02T00:00:00Z", "query": "q", "response": "r"}
+            ],
+        }
+        for producer_id in PRODUCER_IDS
+    ]
+    input_path = tmp_path / "producer_data.ndjson"
+    input_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return ProducerDataProcessor(
+        str(input_path), str(tmp_path / "out"), producer_batch_size=3
+    )
+
+
+def producer_ids(prompt):
+    return re.findall(r"Producer ID: (\d+)", prompt)
+
+
+def test_profiles_are_assembled_in_producer_order(completion_server, processor):
+    def respond(prompt):
+        ids = producer_ids(prompt)
+        if BATCH_PROMPT in prompt:
+            # Let the first batch finish last, and answer in reverse order
+            if PRODUCER_IDS[0] in ids:
+                time.sleep(0.3)
+            return json.dumps([profile(producer_id) for producer_id in ids[::-1]])
+        if ids:
+            return single_profile(ids[0])
+        return "{}"
+
+    completion_server.respond = respond
+    dataframes = processor.extract_and_process_data()
+    processor.create_dashboard_csvs(dataframes, "insights")
+
+    producers = pd.read_csv(f"{processor.output_dir}/producers.csv", dtype=str)
+    assert list(producers["producer_id"]) == PRODUCER_IDS
+    # The last batch has a single producer and uses the single-profile prompt
+    assert list(producers["name"]) == [
+        f"Farmer {producer_id}" for producer_id in PRODUCER_IDS[:6]
+    ] + [f"Single {PRODUCER_IDS[6]}"]
+
+
+def test_rate_limited_request_is_retried(completion_server, processor, monkeypatch):
+    delays = []
+    monkeypatch.setattr(
+        data_generation,
+        "time",
+        types.SimpleNamespace(
+            monotonic=time.monotonic, time=time.time, sleep=delays.append
+        ),
+    )
+
+    def respond(prompt):
+        if len(completion_server.prompts) <= 2:
+            return 429, "Rate limit reached"
+        return single_profile(producer_ids(prompt)[0])
+
+    completion_server.respond = respond
+    details = processor.generate_producer_details_with_openai(
+        PRODUCER_IDS[0], {"total_images": 1}
+    )
+
+    assert details["name"] == f"Single {PRODUCER_IDS[0]}"
+    assert len(completion_server.prompts) == 3
+    assert delays == [1, 2]
+
+
+def test_invalid_batch_profiles_are_requested_separately(completion_server, processor):
+    first, second, third = PRODUCER_IDS[:3]
+
+    def respond(prompt):
+        if BATCH_PROMPT in prompt:
+            invalid = dict(profile(second), age="unknown")
+            # The third producer is missing from the answer
+            return "Profiles:\n" + json.dumps([profile(first), invalid])
+        return single_profile(producer_ids(prompt)[0])
+
+    completion_server.respond = respond
+    producers = [(producer_id, {"total_images": 1}) for producer_id in PRODUCER_IDS[:3]]
+    details = processor.generate_producer_details_batch_with_openai(producers)
+
+    assert [d["name"] for d in details] == [
+        f"Farmer {first}",
+        f"Single {second}",
+        f"Single {third}",
+    ]
+    assert [producer_ids(prompt) for prompt in completion_server.prompts[1:]] == [
+        [second],
+        [third],
+    ]
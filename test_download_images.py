@@ -0,0 +1,132 @@
+import csv
+import functools
+import hashlib
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download_images import JOURNAL_FILENAME, download_images_from_csv
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """Serve tmp_path/site over HTTP, recording the requested paths."""
+    site_dir = tmp_path / "site"
+    site_dir.mkdir()
+    requested = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(Handler, directory=str(site_dir))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", site_dir, requested
+    server.shutdown()
+    server.server_close()
+
+
+def add_file(site_dir, path, body):
+    file_path = site_dir / path
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_bytes(body)
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run(csv_path, img_dir):
+    download_images_from_csv(str(csv_path), str(img_dir), max_workers=4, retries=0)
+
+
+def test_downloads_images_and_skips_them_on_rerun(http_server, tmp_path):
+    base_url, site_dir, requested = http_server
+    add_file(site_dir, "a.jpg", b"image a")
+    add_file(site_dir, "b.png", b"image b")
+    csv_path = tmp_path / "images.csv"
+    write_csv(csv_path, [{"url": f"{base_url}/a.jpg"}, {"url": f"{base_url}/b.png"}])
+    img_dir = tmp_path / "img"
+
+    run(csv_path, img_dir)
+
+    assert (img_dir / "a.jpg").read_bytes() == b"image a"
+    assert (img_dir / "b.png").read_bytes() == b"image b"
+    assert (img_dir / JOURNAL_FILENAME).exists()
+
+    # Both images are in the journal, so nothing is fetched again
+    requested.clear()
+    run(csv_path, img_dir)
+    assert requested == []
+
+
+def test_missing_image_is_not_saved_or_journaled(http_server, tmp_path):
+    base_url, site_dir, requested = http_server
+    csv_path = tmp_path / "images.csv"
+    write_csv(csv_path, [{"url": f"{base_url}/missing.jpg"}])
+    img_dir = tmp_path / "img"
+
+    run(csv_path, img_dir)
+
+    assert list(img_dir.iterdir()) == []
+
+    # The failed image is requested again on the next run
+    requested.clear()
+    run(csv_path, img_dir)
+    assert requested == ["/missing.jpg"]
+
+
+def test_checksum_mismatch_leaves_no_file(http_server, tmp_path):
+    base_url, site_dir, _ = http_server
+    add_file(site_dir, "a.jpg", b"image a")
+    csv_path = tmp_path / "images.csv"
+    write_csv(
+        csv_path,
+        [
+            {
+                "url": f"{base_url}/a.jpg",
+                "sha256": hashlib.sha256(b"other").hexdigest(),
+            }
+        ],
+    )
+    img_dir = tmp_path / "img"
+
+    run(csv_path, img_dir)
+
+    assert list(img_dir.iterdir()) == []
+
+
+def test_duplicate_filenames_are_downloaded_once(http_server, tmp_path):
+    base_url, site_dir, requested = http_server
+    add_file(site_dir, "p1/IMG_0001.jpg", b"producer 1" * 10000)
+    add_file(site_dir, "p2/IMG_0001.jpg", b"producer 2" * 10000)
+    csv_path = tmp_path / "images.csv"
+    write_csv(
+        csv_path,
+        [
+            {"url": f"{base_url}/p1/IMG_0001.jpg"},
+            {"url": f"{base_url}/p2/IMG_0001.jpg"},
+            {"url": f"{base_url}/p1/IMG_0001.jpg"},
+        ],
+    )
+    img_dir = tmp_path / "img"
+
+    run(csv_path, img_dir)
+
+    assert requested == ["/p1/IMG_0001.jpg"]
+    assert (img_dir / "IMG_0001.jpg").read_bytes() == b"producer 1" * 10000
+    assert sorted(path.name for path in img_dir.iterdir()) == [
+        JOURNAL_FILENAME,
+        "IMG_0001.jpg",
+    ]